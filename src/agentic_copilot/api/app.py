@@ -0,0 +1,128 @@
+import asyncio
+import sys
+import uuid
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse
+
+from agentic_copilot.config import configure_pandas, settings
+from agentic_copilot.models.agents.query.esg_query_engine import (
+    get_esg_query_engine,
+    is_esg_query_engine_loaded,
+)
+from agentic_copilot.models.agents.query.client_datastream_matching_engine import client_engine_cache
+from agentic_copilot.models.utils.agent_DOMs import (
+    AgentRequest,
+    AgentResponse,
+    AgentResponseState,
+)
+from agentic_copilot.models.utils.agents_util import AgentsState, get_logger
+from agentic_copilot.models.utils.calculation_sandbox import get_calculation_sandbox
+from agentic_copilot.models.utils.llm_utils import llm_client_pool, price_registry
+from agentic_copilot.models.utils.session_store import SessionConflictError, get_session_store
+from agentic_copilot.workflows.classifier_registry import classifier_registry
+from agentic_copilot.workflows.workflow import CopilotFlow
+
+logger = get_logger(__name__, stream_output=sys.stdout)
+
+
+def warm_up() -> None:
+    """Loads the models and indexes every request needs, each worker process loads its own copy."""
+    for name, load in (("classifiers", classifier_registry.load_all), ("ESG index", get_esg_query_engine)):
+        try:
+            load()
+        except Exception as e:
+            logger.info(f"Couldn't load the {name} during warm up: {str(e)}")
+
+    client_engine_cache.prewarm(settings.hot_client_ids)
+    # Without a price snapshot the prices are fetched in the background, the first traced call doesn't wait for them
+    price_registry.prefetch()
+    # The sandbox workers are started before the first request instead of delaying its calculation
+    get_calculation_sandbox()
+
+
+async def purge_expired_sessions(interval: float = settings.session_purge_interval) -> None:
+    """Deletes the expired sessions from the session store every interval seconds."""
+    store = get_session_store()
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            purged = await asyncio.to_thread(store.purge_expired)
+            logger.info(f"Purged {purged} expired sessions")
+        except Exception as e:
+            logger.info(f"Couldn't purge the expired sessions: {str(e)}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    configure_pandas()
+    await asyncio.to_thread(warm_up)
+    purge_task = asyncio.create_task(purge_expired_sessions())
+    yield
+    purge_task.cancel()
+    await llm_client_pool.aclose()
+    sandbox = get_calculation_sandbox()
+    if sandbox is not None:
+        sandbox.close()
+
+
+app = FastAPI(title="Agentic Copilot", lifespan=lifespan)
+
+
+@app.post("/chat", response_model=AgentResponse)
+async def chat(request: AgentRequest) -> AgentResponse:
+    """Runs one turn of the conversation, the state of the conversation is kept in the session store."""
+    store = get_session_store()
+    session_id = request.session_id or uuid.uuid4().hex
+
+    stored = await asyncio.to_thread(store.get, session_id, request.user_id)
+    if stored is None:
+        state, version, continue_bool = AgentsState(user_id=request.user_id), None, False
+    else:
+        state, version, continue_bool = stored.state, stored.version, True
+
+    workflow = CopilotFlow(timeout=settings.workflow_timeout)
+    answer, state = await workflow.run(state=state, utterance=request.utterance, continue_bool=continue_bool)
+
+    try:
+        await asyncio.to_thread(store.put, session_id, request.user_id, state, version)
+    except SessionConflictError as e:
+        # Another request of the same session finished first, its answer is kept
+        raise HTTPException(status_code=409, detail=str(e))
+
+    return AgentResponse(
+        session_id=session_id,
+        base_utterance=state.base_utterance or request.utterance,
+        answer=str(answer),
+        state=AgentResponseState(
+            chat_history=[str(message) for message in state.chat_history],
+            plan=[(str(speaker), str(instruction)) for speaker, instruction in state.plan],
+            current_step=state.current_step,
+        ),
+    )
+
+
+@app.get("/health")
+async def health() -> JSONResponse:
+    """Ready when the classifiers, the ESG index and the engines of the hot clients are loaded in this worker."""
+    checks = {
+        "classifiers": classifier_registry.is_loaded(),
+        "esg_index": is_esg_query_engine_loaded(),
+        "datastream_engines": all(client_engine_cache.is_loaded(client_id) for client_id in settings.hot_client_ids),
+    }
+    ready = all(checks.values())
+
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={"status": "ok" if ready else "loading", "checks": checks},
+    )
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    # Run from the src directory, with several workers every worker process loads the models on its own
+    uvicorn.run(
+        "agentic_copilot.api.app:app", host=settings.api_host, port=settings.api_port, workers=settings.api_workers
+    )
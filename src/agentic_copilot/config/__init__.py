@@ -2,3 +2,14 @@ from .settings import Settings
 
 settings = Settings()
 overrides = {"model_override": "", "deployment_override": ""}
+
+
+def configure_pandas() -> None:
+    """Process-wide pandas options, called once by every entry point (API, CLI and tests) before any data is loaded.
+
+    Copy-on-write is enabled because the agents share views of the loaded datasets and of the queried frames: a view
+    that gets modified is copied first instead of changing the shared data.
+    """
+    import pandas as pd
+
+    pd.set_option("mode.copy_on_write", True)
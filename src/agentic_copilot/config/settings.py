@@ -25,6 +25,31 @@ class Settings(YamlBaseSettings):
     embedding_model: str
     embedding_deployment: str
     embedding_api_version: str
+    # Width of the vectors of embedding_model, the utterance classifiers are fitted on them
+    embedding_dimensions: int = 1536
     max_function_calls: int
+    embedding_cache_size: int = 20000
+    datastream_engine_cache_size: int = 32
+    hot_client_ids: list[int] = []
+    llm_max_connections: int = 100
+    llm_max_keepalive_connections: int = 20
+    llm_keepalive_expiry: float = 30.0
+    llm_timeout: float = 60.0
+    llm_price_ttl: float = 3600.0
+    plan_max_parallel_steps: int = 4
+    state_token_budget: int = 3000
+    session_db_path: str = "data/.cache/sessions.sqlite"
+    session_ttl: float = 86400.0
+    session_memory_bytes: int = 256 * 1024 * 1024
+    session_purge_interval: float = 3600.0
+    workflow_timeout: float = 300.0
+    api_host: str = "0.0.0.0"
+    api_port: int = 8000
+    api_workers: int = 1
+    calculation_sandbox: bool = True
+    sandbox_workers: int = 2
+    sandbox_cpu_seconds: int = 30
+    sandbox_memory_bytes: int = 4 * 1024 * 1024 * 1024
+    sandbox_timeout: float = 60.0
 
     model_config = SettingsConfigDict(yaml_file=yaml_config_location())
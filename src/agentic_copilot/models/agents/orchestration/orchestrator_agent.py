@@ -1,8 +1,13 @@
 import sys
+from functools import cached_property
 
 from llama_index.core import PromptTemplate
 from llama_index.core.tools import FunctionTool
 
+from agentic_copilot.models.agents.orchestration.plan_executor import (
+    PlanExecutor,
+    StepResult,
+)
 from agentic_copilot.models.agents.orchestration.planning_agent import PlanningAgent
 from agentic_copilot.models.agents.orchestration.research_agent import ResearchAgent
 from agentic_copilot.models.agents.query.calculation_agent import CalculationAgent
@@ -21,6 +26,10 @@ from agentic_copilot.models.utils.llm_utils import LLMModels
 
 class OrchestratorAgent(AgentBase):
     id: Speaker = Speaker.ORCHESTRATOR
+    agent_description = """
+        An orchestration agent coordinates multiple specialized agents to answer a user’s query by managing tasks such
+        as querying user records, executing database queries, and retrieving information from company documents.
+        """
     EXECUTION_DONE = "EXECTUION_DONE"
     NEED_INPUT = "NEED_INPUT"
 
@@ -56,6 +65,7 @@ class OrchestratorAgent(AgentBase):
 
         3. **EXECUTING THE PLAN**:
             - AFTER RECEIVING THE COMPLETE PLAN, START EXECUTING IT WITH YOUR TOOLS.
+            - PREFER THE **execute_plan** TOOL: IT EXECUTES EVERY REMAINING STEP OF THE PLAN, INDEPENDENT STEPS IN PARALLEL, AND STOPS AT THE FIRST STEP THAT NEEDS USER INPUT. AFTER THE PLAN WAS MODIFIED BASED ON THE USER INPUT, CALL IT AGAIN TO CONTINUE.
             - IF THE PLAN REQUIRES BACKGROUND RESEARCH, PASS THE TASK TO THE RESEARCH AGENT. WAIT FOR THE RESEARCH AGENT TO RETURN THE REQUIRED INFORMATION BEFORE PROCEEDING.
             - AFTER RESEARCH IS COMPLETED, PASS THE APPROPRIATE QUERIES TO THE QUERY ORCHESTRATOR AGENT.
             - IF MORE USER INPUT IS REQUIRED TO COMPLETE ANY QUERY PROCESS, REQUEST IT IMMEDIATELY AND RETURN THE RESPONSE TO THE QUERY ORCHESTRATOR AGENT.
@@ -194,27 +204,54 @@ class OrchestratorAgent(AgentBase):
     ) -> None:
         super().__init__(state=state, model=model, agent_framework=agent_framework, cli_print=cli_print)
         self.logger = get_logger(__name__, stream_output=sys.stdout)
-        self.planning_agent = PlanningAgent(state=state)
-        self.query_orchestrator_agent = QueryOrchestratorAgent(state=state)
-        self.calculation_agent = CalculationAgent(state=state)
-        self.research_agent = ResearchAgent(state=state)
         self.continue_conversation = continue_conversation
 
+    # The sub-agents are only built when the orchestrator first delegates to them, most turns use a few of them
+    @cached_property
+    def planning_agent(self) -> PlanningAgent:
+        return PlanningAgent(state=self.state)
+
+    @cached_property
+    def query_orchestrator_agent(self) -> QueryOrchestratorAgent:
+        return QueryOrchestratorAgent(state=self.state)
+
+    @cached_property
+    def calculation_agent(self) -> CalculationAgent:
+        return CalculationAgent(state=self.state)
+
+    @cached_property
+    def research_agent(self) -> ResearchAgent:
+        return ResearchAgent(state=self.state)
+
     def choose_planning_agent(self, instruction: str) -> str:
         """Use this tool to choose the planning agent as the next agent."""
         self.logger.info("Choose planning agent tool has been chosen")
 
-        self.state.plan.clear()
+        self.state.clear_plan()
         self.state.chat_history.append(f"Orchestrator agent to Planning agent: {instruction}")
         try:
             response = self.planning_agent.chat(instruction)
             response_status, response_body = eval_response(response)
         except Exception as e:
-            message = f"Error occured when processing response of Planning agent: {str(e)}"
-            self.logger.info(message)
-            return message
+            return self._delegation_error("Planning", e)
+
+        return self._planning_result(response_status, response_body, str(response))
+
+    async def achoose_planning_agent(self, instruction: str) -> str:
+        """Use this tool to choose the planning agent as the next agent."""
+        self.logger.info("Choose planning agent tool has been chosen")
+
+        self.state.clear_plan()
+        self.state.chat_history.append(f"Orchestrator agent to Planning agent: {instruction}")
+        try:
+            response_status, response_body = await self.planning_agent.achat(instruction)
+        except Exception as e:
+            return self._delegation_error("Planning", e)
+
+        return self._planning_result(response_status, response_body, str((response_status, response_body)))
 
-        self.state.chat_history.append(f"Planning agent to Orchestrator agent: {str(response)}")
+    def _planning_result(self, response_status: str, response_body: str, response: str) -> str:
+        self.state.chat_history.append(f"Planning agent to Orchestrator agent: {response}")
 
         if str(PlanningAgent.PLAN_DONE) == response_status:
             self.logger.info("Plan was finished, now proceed to execution.")
@@ -243,10 +280,24 @@ class OrchestratorAgent(AgentBase):
             response = self.query_orchestrator_agent.chat(instruction)
             response_status, response_body = eval_response(response)
         except Exception as e:
-            message = f"Error occured when processing response of QueryOrchestrator agent: {str(e)}"
-            self.logger.info(message)
-            return message
+            return self._delegation_error("QueryOrchestrator", e)
 
+        return self._query_orchestrator_result(response_status, response_body, str(response))
+
+    async def achoose_query_orchestrator_agent(self, instruction: str) -> str:
+        """ "Use this tool to choose the query orchestrator agent as the next agent"""
+        self.logger.info("Choose Query Orcehstrator agent tool has been chosen")
+
+        self.state.chat_history.append(f"Orchestrator agent to QueryOrchestrator agent: {instruction}")
+
+        try:
+            response_status, response_body = await self.query_orchestrator_agent.achat(instruction)
+        except Exception as e:
+            return self._delegation_error("QueryOrchestrator", e)
+
+        return self._query_orchestrator_result(response_status, response_body, str((response_status, response_body)))
+
+    def _query_orchestrator_result(self, response_status: str, response_body: str, response: str) -> str:
         self.state.chat_history.append(
             f"Query orchestrator agent to Orchestrator agent: {response_status, response_body}"
         )
@@ -263,7 +314,7 @@ class OrchestratorAgent(AgentBase):
             self.logger.info(f"Unsuccesful query, need input: {response_body}")
             return f"""
                 Query agent requires user input:
-                {str(response)}
+                {response}
             """
 
     def choose_calculation_agent(self, instruction: str):
@@ -277,12 +328,26 @@ class OrchestratorAgent(AgentBase):
             response_status, response_body = eval_response(response)
 
         except Exception as e:
-            message = f"Error occured when processing response of CalculationAgent agent: {str(e)}"
-            self.logger.info(message)
-            return message
+            return self._delegation_error("CalculationAgent", e)
+
+        return self._calculation_result(response_status, response_body, str(response))
+
+    async def achoose_calculation_agent(self, instruction: str):
+        """Use this tool to choose calculation agent as the next agent."""
+        self.logger.info(f"Calculation agent tool has been chosen with instruction: {instruction}")
 
-        self.state.chat_history.append(f"Calculation agent to Orchestrator agent: {str(response)}")
-        self.logger.info(f"Calculation agent response: {str(response)}")
+        self.state.chat_history.append(f"Orchestrator agent to Calculation agent: {instruction}")
+
+        try:
+            response_status, response_body = await self.calculation_agent.achat(instruction)
+        except Exception as e:
+            return self._delegation_error("CalculationAgent", e)
+
+        return self._calculation_result(response_status, response_body, str((response_status, response_body)))
+
+    def _calculation_result(self, response_status: str, response_body: str, response: str) -> str:
+        self.state.chat_history.append(f"Calculation agent to Orchestrator agent: {response}")
+        self.logger.info(f"Calculation agent response: {response}")
 
         if response_status == str(CalculationAgent.CALCULATION_DONE):
             return f"""
@@ -297,7 +362,7 @@ class OrchestratorAgent(AgentBase):
             """
 
     def choose_research_agent(self, instruction: str):
-        """Use this tool to choose calculation agent as the next agent."""
+        """Use this tool to choose the research agent as the next agent."""
         self.logger.info(f"Research agent tool has been chosen with instruction: {instruction}")
 
         self.state.chat_history.append(f"Orchestrator agent to Research agent: {instruction}")
@@ -307,12 +372,26 @@ class OrchestratorAgent(AgentBase):
             response_status, response_body = eval_response(response)
 
         except Exception as e:
-            message = f"Error occured when processing response of CalculationAgent agent: {str(e)}"
-            self.logger.info(message)
-            return message
+            return self._delegation_error("Research", e)
+
+        return self._research_result(response_status, response_body, str(response))
+
+    async def achoose_research_agent(self, instruction: str):
+        """Use this tool to choose the research agent as the next agent."""
+        self.logger.info(f"Research agent tool has been chosen with instruction: {instruction}")
+
+        self.state.chat_history.append(f"Orchestrator agent to Research agent: {instruction}")
+
+        try:
+            response_status, response_body = await self.research_agent.achat(instruction)
+        except Exception as e:
+            return self._delegation_error("Research", e)
+
+        return self._research_result(response_status, response_body, str((response_status, response_body)))
 
-        self.state.chat_history.append(f"Calculation agent to Orchestrator agent: {str(response)}")
-        self.logger.info(f"Calculation agent response: {str(response)}")
+    def _research_result(self, response_status: str, response_body: str, response: str) -> str:
+        self.state.chat_history.append(f"Research agent to Orchestrator agent: {response}")
+        self.logger.info(f"Research agent response: {response}")
 
         if response_status == str(ResearchAgent.RESEARCH_DONE):
             return f"""
@@ -323,9 +402,46 @@ class OrchestratorAgent(AgentBase):
         elif response_status == str(ResearchAgent.RESEARCH_NEED_INPUT):
             self.logger.info(f"Research need input: {response_body}")
             return f"""
-                Calculation need input: {response_body}
+                Research need input: {response_body}
+            """
+
+    def execute_plan(self) -> str:
+        """Use this tool to execute every remaining step of the plan. Steps that don't depend on each other run in
+        parallel. The execution stops when a step needs user input, call this tool again after the plan was modified.
+        """
+        self.logger.info("Execute plan tool has been chosen")
+        return self._plan_execution_result(PlanExecutor(state=self.state, model=self.model).run())
+
+    async def aexecute_plan(self) -> str:
+        """Use this tool to execute every remaining step of the plan. Steps that don't depend on each other run in
+        parallel. The execution stops when a step needs user input, call this tool again after the plan was modified.
+        """
+        self.logger.info("Execute plan tool has been chosen")
+        return self._plan_execution_result(await PlanExecutor(state=self.state, model=self.model).arun())
+
+    def _plan_execution_result(self, blocked: StepResult | None) -> str:
+        if blocked is None:
+            self.logger.info("Every step of the plan has been executed")
+            return f"""
+                Every step of the plan was executed, the results are written in the state object:
+                Calculation results: {self.state.calculation_results}
+                Research results: {self.state.research_results}
+
+                Now use the done tool to answer the user.
             """
 
+        self.logger.info(f"Plan execution stopped at step {blocked.step}: {blocked.status, blocked.message}")
+        return f"""
+            Plan execution stopped at step {blocked.step} ({blocked.speaker}), the steps {self.state.completed_steps}
+            are finished. The agent responded with {blocked.status}:
+            {blocked.message}
+        """
+
+    def _delegation_error(self, agent_name: str, e: Exception) -> str:
+        message = f"Error occured when processing response of {agent_name} agent: {str(e)}"
+        self.logger.info(message)
+        return message
+
     def need_input(self, question) -> tuple[str, str]:
         """Use this toon when you need to ask a question from the user or one of you agents requested a new input from
         the user. The question parameter must contain the input request adressed to the user.
@@ -360,13 +476,6 @@ class OrchestratorAgent(AgentBase):
 
         return response
 
-    @property
-    def agent_description(self) -> str:
-        return """
-        An orchestration agent coordinates multiple specialized agents to answer a user’s query by managing tasks such
-        as querying user records, executing database queries, and retrieving information from company documents.
-        """
-
     @property
     def system_prompt(self) -> str:
         if not self.continue_conversation:
@@ -387,12 +496,24 @@ class OrchestratorAgent(AgentBase):
                 # few_shot_examples=self.few_shot_examples,
             )
 
-    @property
+    @cached_property
     def tools(self) -> list[FunctionTool]:
         return [
-            FunctionTool.from_defaults(fn=self.need_input, name="need_input", return_direct=True),
-            FunctionTool.from_defaults(fn=self.choose_planning_agent, name="choose_planning_agent"),
-            FunctionTool.from_defaults(fn=self.choose_query_orchestrator_agent, name="choose_query_orchestrator_agent"),
-            FunctionTool.from_defaults(fn=self.choose_calculation_agent, name="choose_calculation_agent"),
-            FunctionTool.from_defaults(fn=self.done, name="done", return_direct=True),
+            self.tool(fn=self.need_input, name="need_input", return_direct=True),
+            # The async variants are used when the agent is driven through achat, so nested agents don't block the loop
+            self.tool(
+                fn=self.choose_planning_agent, async_fn=self.achoose_planning_agent, name="choose_planning_agent"
+            ),
+            self.tool(
+                fn=self.choose_query_orchestrator_agent,
+                async_fn=self.achoose_query_orchestrator_agent,
+                name="choose_query_orchestrator_agent",
+            ),
+            self.tool(
+                fn=self.choose_calculation_agent,
+                async_fn=self.achoose_calculation_agent,
+                name="choose_calculation_agent",
+            ),
+            self.tool(fn=self.execute_plan, async_fn=self.aexecute_plan, name="execute_plan"),
+            self.tool(fn=self.done, name="done", return_direct=True),
         ]
@@ -0,0 +1,181 @@
+import asyncio
+import sys
+from typing import NamedTuple, Optional, TextIO
+
+from agentic_copilot.config import settings
+from agentic_copilot.models.agents.orchestration.research_agent import ResearchAgent
+from agentic_copilot.models.agents.query.calculation_agent import CalculationAgent
+from agentic_copilot.models.agents.query.query_orchestrator_agent import (
+    QueryOrchestratorAgent,
+)
+from agentic_copilot.models.utils.agent_base import AgentBase
+from agentic_copilot.models.utils.agents_util import (
+    AgentsState,
+    Speaker,
+    eval_response,
+    get_logger,
+)
+from agentic_copilot.models.utils.llm_utils import LLMModels
+
+# Agent executing the steps of each speaker and the status it returns when the step is finished
+STEP_AGENTS: dict[Speaker, tuple[type[AgentBase], str]] = {
+    Speaker.QUERY_ORCHESTRATOR: (QueryOrchestratorAgent, QueryOrchestratorAgent.QUERY_DONE),
+    Speaker.CALCULATION: (CalculationAgent, CalculationAgent.CALCULATION_DONE),
+    Speaker.RESEARCH_AGENT: (ResearchAgent, ResearchAgent.RESEARCH_DONE),
+}
+
+STEP_FAILED = "STEP_FAILED"
+
+# List fields of the state the step agents append to
+STEP_OUTPUT_FIELDS = ("chat_history", "research_results", "calculation_results")
+
+
+class StepResult(NamedTuple):
+    step: int
+    speaker: str
+    status: str
+    message: str
+    done: bool
+
+
+class StepNamespace:
+    """Copy of the state a concurrently executed step works on, so steps running side by side don't see (or
+    overwrite) each other's queried data. What the step added is merged back into the state when it finishes."""
+
+    def __init__(self, state: AgentsState) -> None:
+        self.state = state.snapshot()
+        self._queried_data = dict(dict.items(self.state.queried_data))
+        self._lengths = {field: len(getattr(self.state, field)) for field in STEP_OUTPUT_FIELDS}
+
+    def merge_into(self, state: AgentsState) -> None:
+        # Snapshot placeholders the step read come back decoded, merging them saves the state from decoding them again
+        added = {
+            name: value
+            for name, value in dict.items(self.state.queried_data)
+            if self._queried_data.get(name) is not value
+        }
+        if added:
+            state.queried_data.update(added)
+        for field in STEP_OUTPUT_FIELDS:
+            new_items = getattr(self.state, field)[self._lengths[field] :]
+            if new_items:
+                getattr(state, field).extend(new_items)
+
+
+class PlanExecutor:
+    """Executes the plan in the state without asking an LLM which step comes next.
+
+    Every step is started as soon as the steps it depends on are completed, at most max_parallel_steps at a time.
+    Steps are always started in plan order, so the same plan is executed the same way every time. When a step needs
+    user input (or fails) no new steps are started, the running ones are finished and the state points at the
+    blocking step, so the execution can be continued after the plan was modified. Concurrently executed steps work on
+    their own StepNamespace.
+    """
+
+    def __init__(
+        self,
+        state: AgentsState,
+        model: LLMModels = LLMModels.GPT_4O,
+        max_parallel_steps: int = settings.plan_max_parallel_steps,
+        stream_output: TextIO = sys.stdout,
+    ) -> None:
+        self.state = state
+        self.model = model
+        self.max_parallel_steps = max(1, max_parallel_steps)
+        self.logger = get_logger(__name__, stream_output=stream_output)
+
+    def _create_agent(self, speaker: str, state: AgentsState) -> tuple[AgentBase, str]:
+        agent_class, done_status = STEP_AGENTS[Speaker(speaker)]
+        # Every step gets its own agent, parallel steps of the same speaker don't share tools or chat memory
+        return agent_class(state=state, model=self.model), done_status
+
+    def _start_step(self, step: int) -> tuple[str, str]:
+        speaker, instruction = self.state.plan[step]
+        self.logger.info(f"Executing step {step} with {speaker}: {instruction}")
+        self.state.chat_history.append(f"Orchestrator agent to {speaker} (step {step}): {instruction}")
+
+        return speaker, instruction
+
+    def _step_result(self, step: int, speaker: str, status: str, message: str, done_status: str) -> StepResult:
+        self.state.chat_history.append(f"{speaker} to Orchestrator agent (step {step}): {status, message}")
+        return StepResult(step, speaker, status, message, status == str(done_status))
+
+    def _step_failed(self, step: int, speaker: str, e: Exception) -> StepResult:
+        message = f"Error occured when executing step {step} with {speaker}: {str(e)}"
+        self.logger.info(message)
+        return StepResult(step, speaker, STEP_FAILED, message, False)
+
+    def run_step(self, step: int) -> StepResult:
+        speaker, instruction = self._start_step(step)
+        try:
+            agent, done_status = self._create_agent(speaker, self.state)
+            status, message = eval_response(agent.chat(instruction))
+        except Exception as e:
+            return self._step_failed(step, speaker, e)
+
+        return self._step_result(step, speaker, status, message, done_status)
+
+    async def arun_step(self, step: int) -> StepResult:
+        speaker, instruction = self._start_step(step)
+        namespace = StepNamespace(self.state)
+        try:
+            agent, done_status = self._create_agent(speaker, namespace.state)
+            status, message = await agent.achat(instruction)
+        except Exception as e:
+            return self._step_failed(step, speaker, e)
+        finally:
+            namespace.merge_into(self.state)
+
+        return self._step_result(step, speaker, status, message, done_status)
+
+    def _record(self, result: StepResult) -> None:
+        if result.done:
+            self.state.completed_steps.append(result.step)
+
+    def _finish(self, blocked: Optional[StepResult]) -> Optional[StepResult]:
+        self.state.completed_steps.sort()
+        if blocked is not None:
+            self.state.current_step = blocked.step
+        elif len(self.state.completed_steps) == len(self.state.plan):
+            self.state.current_step = len(self.state.plan)
+
+        return blocked
+
+    def run(self) -> Optional[StepResult]:
+        """Executes the remaining steps one by one.
+        Returns the step that needs input or failed, None when the whole plan was executed."""
+        blocked = None
+        ready = self.state.ready_steps()
+        while ready and blocked is None:
+            result = self.run_step(ready[0])
+            self._record(result)
+            if not result.done:
+                blocked = result
+            ready = self.state.ready_steps()
+
+        return self._finish(blocked)
+
+    async def arun(self) -> Optional[StepResult]:
+        """Executes the remaining steps, independent steps concurrently.
+        Returns the first step (in plan order) that needs input or failed, None when the whole plan was executed."""
+        blocked: Optional[StepResult] = None
+        running: dict[asyncio.Task, int] = {}
+
+        while True:
+            if blocked is None:
+                free_slots = self.max_parallel_steps - len(running)
+                for step in self.state.ready_steps(running=set(running.values()))[:free_slots]:
+                    running[asyncio.create_task(self.arun_step(step))] = step
+
+            if not running:
+                break
+
+            finished, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in sorted(finished, key=running.get):
+                running.pop(task)
+                result = task.result()
+                self._record(result)
+                if not result.done and (blocked is None or result.step < blocked.step):
+                    blocked = result
+
+        return self._finish(blocked)
@@ -1,5 +1,6 @@
 import sys
-from typing import TextIO
+from functools import cache, cached_property
+from typing import Optional, TextIO
 
 from llama_index.core import PromptTemplate
 from llama_index.core.tools import FunctionTool
@@ -21,6 +22,9 @@ class PlanningAgent(AgentBase):
     PLAN_DONE = "PLAN_DONE"
     PLAN_NEED_INPUT = "PLAN_NEED_INPUT"
     id: Speaker = Speaker.PLANNING
+    agent_description = """An agent that creates plans for an agentic system formulates a sequence of actions or
+        strategies to achieve specific goals, considering available tools, constraints, and the system’s environment,
+        ensuring optimal decision-making and adaptability."""
 
     prompt_template = PromptTemplate(
         """
@@ -50,6 +54,7 @@ class PlanningAgent(AgentBase):
         - IF DATA RESEARCH IS REQUIRED, USE THE `add_research_to_plan` TOOL TO INCORPORATE THE RESEARCH AGENT INTO THE PLAN.
         - IF CALCULATIONS OR DATA PROCESSING ARE REQUIRED, USE THE `add_calculation_to_plan` TOOL TO ADD A CALCULATION STEP.
         4. **SEQUENCE THE AGENTS**: DETERMINE THE ORDER OF AGENTS AND MAKE SURE THEY ARE PLACED IN THE PLAN ACCORDING TO THE DEPENDENCIES OF THE TASK.
+        - GIVE EVERY STEP THE INDICES OF THE EARLIER STEPS IT NEEDS THROUGH THE `depends_on` PARAMETER. STEPS WITHOUT DEPENDENCIES BETWEEN THEM (FOR EXAMPLE QUERIES OF DIFFERENT DATASETS) ARE EXECUTED IN PARALLEL.
         5. **FINALIZE PLAN**: USE THE `done` TOOL TO FINALIZE THE PLAN AFTER ADDING ALL THE NECESSARY STEPS. ENSURE NO REDUNDANT ACTIONS ARE INCLUDED.
 
         ### WHAT NOT TO DO ###
@@ -91,6 +96,9 @@ class PlanningAgent(AgentBase):
         The agent does the following:
         {agent_description}
         The instruction for the agent must be passed through the instruction parameter.
+        Pass the indices (starting from 0) of the earlier steps whose results this step needs through the depends_on
+        parameter. Steps that don't depend on each other are executed in parallel. Without depends_on a calculation
+        step depends on every earlier step and any other step on none.
     """
     )
 
@@ -137,6 +145,7 @@ class PlanningAgent(AgentBase):
         )
         self.logger = get_logger(__name__, stream_output=stream_output)
         self.plan = []
+        self.dependencies: list[list[int]] = []
 
     def start_planning(self, plan_utterance: str) -> None:
         """If there is no plan yet indicate with this tool that you started the planning process.
@@ -145,23 +154,47 @@ class PlanningAgent(AgentBase):
         """
         self.logger.info("start_planning tool has been chosen")
         self.state.plan.clear()
+        self.plan.clear()
+        self.dependencies.clear()
         self.state.base_utterance = plan_utterance
         return f"Planning started current plan:\n{self.plan}"
 
-    def add_research_to_plan(self, instruction: str) -> str:
+    def _add_step(self, speaker: str, instruction: str, depends_on: Optional[list[int]]) -> int:
+        step = len(self.plan)
+        if depends_on is None:
+            # Calculations work on everything gathered before them, data gathering steps are independent by default
+            depends_on = list(range(step)) if speaker == CalculationAgent.id else []
+
+        invalid = [dependency for dependency in depends_on if not 0 <= dependency < step]
+        if invalid:
+            raise ValueError(f"Steps can only depend on earlier steps (0-{step - 1}), got: {invalid}")
+
+        self.plan.append((speaker, instruction))
+        self.dependencies.append(sorted(set(depends_on)))
+        return step
+
+    def add_research_to_plan(self, instruction: str, depends_on: Optional[list[int]] = None) -> str:
         self.logger.info("add_research_to_plan tool has been chosen")
-        self.plan.append((ResearchAgent.id, instruction))
-        return f"Research step added to plan, current plan: {self.plan}"
+        step = self._add_step(ResearchAgent.id, instruction, depends_on)
+        return f"Research step {step} added to plan, current plan: {self._plan_string()}"
 
-    def add_query_to_plan(self, instruction: str) -> str:
+    def add_query_to_plan(self, instruction: str, depends_on: Optional[list[int]] = None) -> str:
         self.logger.info("add_query_to_plan tool has been chosen")
-        self.plan.append((QueryOrchestratorAgent.id, instruction))
-        return f"Query step added to plan, current plan: {self.plan}"
+        step = self._add_step(QueryOrchestratorAgent.id, instruction, depends_on)
+        return f"Query step {step} added to plan, current plan: {self._plan_string()}"
 
-    def add_calculation_to_plan(self, instruction: str) -> str:
+    def add_calculation_to_plan(self, instruction: str, depends_on: Optional[list[int]] = None) -> str:
         self.logger.info("add_calculation_to_plan tool has been chosen")
-        self.plan.append((CalculationAgent.id, instruction))
-        return f"Calculation step added to plan: {self.plan}"
+        step = self._add_step(CalculationAgent.id, instruction, depends_on)
+        return f"Calculation step {step} added to plan: {self._plan_string()}"
+
+    def _plan_string(self) -> str:
+        return str(
+            [
+                (step, speaker, instruction, f"depends on: {dependencies}")
+                for step, ((speaker, instruction), dependencies) in enumerate(zip(self.plan, self.dependencies))
+            ]
+        )
 
     def need_input(self, question: str) -> tuple[str, str]:
         """Use this tool when you need further input for the plan
@@ -169,8 +202,7 @@ class PlanningAgent(AgentBase):
         Always use this tool before returning to the user"""
         self.logger.info("Need further input tool has been chosen")
 
-        self.state.current_step = 0
-        self.state.plan = self.plan
+        self.state.set_plan(list(self.plan), [list(dependencies) for dependencies in self.dependencies])
 
         ret_value = (str(self.PLAN_NEED_INPUT), question)
 
@@ -179,45 +211,41 @@ class PlanningAgent(AgentBase):
     def done(self, message: str) -> str:
         """Use this tool when you finished the plan.
         Always use this tool or the 'need_input' tool before returning to the user."""
-        self.logger.info(f"plan_done tool has been chosen plan: {self.plan}")
+        self.logger.info(f"plan_done tool has been chosen plan: {self._plan_string()}")
 
-        self.state.current_step = 0
-        self.state.plan = self.plan
+        self.state.set_plan(list(self.plan), [list(dependencies) for dependencies in self.dependencies])
 
         ret_value = (str(self.PLAN_DONE), message)
 
         return ret_value
 
-    @property
+    @classmethod
+    @cache
+    def agent_tool_description(cls, agent: type[AgentBase]) -> str:
+        """Description of the tool adding a step of the agent to the plan, only the class of the agent is needed."""
+        return cls.agent_tool_template.format(agent_name=agent.id, agent_description=agent.agent_description)
+
+    @cached_property
     def tools(self) -> list[FunctionTool]:
-        research_tool_description = self.agent_tool_template.format(
-            agent_name=ResearchAgent.id, agent_description=str(ResearchAgent(self.state).agent_description)
-        )
-        query_tool_description = self.agent_tool_template.format(
-            agent_name=QueryOrchestratorAgent.id,
-            agent_description=str(QueryOrchestratorAgent(self.state).agent_description),
-        )
-        calculation_tool_description = self.agent_tool_template.format(
-            agent_name=CalculationAgent.id,
-            agent_description=str(CalculationAgent(self.state).agent_description),
-        )
         return [
-            FunctionTool.from_defaults(
-                fn=self.add_research_to_plan, name="add_research_to_plan", description=research_tool_description
+            self.tool(
+                fn=self.add_research_to_plan,
+                name="add_research_to_plan",
+                description=self.agent_tool_description(ResearchAgent),
             ),
-            FunctionTool.from_defaults(
-                fn=self.add_query_to_plan, name="add_query_to_plan", description=query_tool_description
+            self.tool(
+                fn=self.add_query_to_plan,
+                name="add_query_to_plan",
+                description=self.agent_tool_description(QueryOrchestratorAgent),
             ),
-            FunctionTool.from_defaults(
+            self.tool(
                 fn=self.add_calculation_to_plan,
                 name="add_calculation_to_plan",
-                description=calculation_tool_description,
+                description=self.agent_tool_description(CalculationAgent),
             ),
-            FunctionTool.from_defaults(fn=self.done, name="done", return_direct=True, description=self.done.__doc__),
-            FunctionTool.from_defaults(
-                fn=self.start_planning, name="start_planning", description=self.start_planning.__doc__
-            ),
-            FunctionTool.from_defaults(
+            self.tool(fn=self.done, name="done", return_direct=True, description=self.done.__doc__),
+            self.tool(fn=self.start_planning, name="start_planning", description=self.start_planning.__doc__),
+            self.tool(
                 fn=self.need_input, name="need_input", return_direct=True, description=self.need_input.__doc__
             ),
         ]
@@ -225,9 +253,3 @@ class PlanningAgent(AgentBase):
     @property
     def system_prompt(self) -> str:
         return self.prompt_template.format(few_shot_examples=self.few_shot_examples)
-
-    @property
-    def agent_description(self) -> str:
-        return """An agent that creates plans for an agentic system formulates a sequence of actions or strategies to
-        achieve specific goals, considering available tools, constraints, and the system’s environment, ensuring
-        optimal decision-making and adaptability."""
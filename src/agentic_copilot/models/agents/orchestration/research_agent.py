@@ -1,9 +1,10 @@
 import sys
+from functools import cached_property
 
 from llama_index.core import PromptTemplate
 from llama_index.core.tools import FunctionTool
 
-from agentic_copilot.models.agents.query.esg_query_engine import ESGQueryEngine
+from agentic_copilot.models.agents.query.esg_query_engine import get_esg_query_engine
 from agentic_copilot.models.utils.agent_base import AgentBase, AgentFrameWork
 from agentic_copilot.models.utils.agents_util import (
     AgentsState,
@@ -15,6 +16,9 @@ from agentic_copilot.models.utils.llm_utils import LLMModels
 
 class ResearchAgent(AgentBase):
     id = Speaker.RESEARCH_AGENT
+    agent_description = """The research agent can query information from the company’s ESG document to provide
+        insights on sustainability efforts, social responsibility initiatives, and governance practices. It can extract
+        key metrics, track compliance, and support decision-making by delivering relevant data from the document."""
     RESEARCH_DONE = "RESEARCH_DONE"
     RESEARCH_NEED_INPUT = "RESEARCH_NEED_INPUT"
 
@@ -107,9 +111,13 @@ class ResearchAgent(AgentBase):
         self.logger.info(f"Query walmart ESG document tool has been chosen with question: {query}")
 
         try:
-            query_result = ESGQueryEngine(model=self.model).query(query)
+            query_result = get_esg_query_engine(self.model).query(query)
         except Exception as e:
             self.logger.info(str(e))
+            return f"""
+                Some error occured while trying to query the ESG document: {query}
+                Error: {str(e)}
+            """
 
         self.logger.info(f"Query was succesful with result: {query_result}")
 
@@ -138,16 +146,10 @@ class ResearchAgent(AgentBase):
     def system_prompt(self) -> str:
         return self.prompt_template.format(agents_state=self.state.get_state_string())
 
-    @property
+    @cached_property
     def tools(self) -> list[FunctionTool]:
         return [
-            FunctionTool.from_defaults(fn=self.need_input, name="need_input", return_direct=True),
-            FunctionTool.from_defaults(fn=self.query_ESG_document, name="query_ESG_document"),
-            FunctionTool.from_defaults(fn=self.done, name="done", return_direct=True),
+            self.tool(fn=self.need_input, name="need_input", return_direct=True),
+            self.tool(fn=self.query_ESG_document, name="query_ESG_document"),
+            self.tool(fn=self.done, name="done", return_direct=True),
         ]
-
-    @property
-    def agent_description(self) -> str:
-        return """The research agent can query information from the company’s ESG document to provide insights on
-        sustainability efforts, social responsibility initiatives, and governance practices. It can extract key metrics,
-        track compliance, and support decision-making by delivering relevant data from the document."""
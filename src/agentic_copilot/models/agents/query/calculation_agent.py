@@ -1,5 +1,7 @@
-import copy
+import asyncio
 import sys
+from functools import cached_property
+from typing import Callable, Optional
 
 import pandas as pd
 from llama_index.core import PromptTemplate
@@ -11,11 +13,29 @@ from agentic_copilot.models.utils.agents_util import (
     Speaker,
     get_logger,
 )
+from agentic_copilot.models.utils import calculation_primitives
+from agentic_copilot.models.utils.calculation_primitives import (
+    Aggregation,
+    GroupColumn,
+    PrimitiveError,
+)
+from agentic_copilot.models.utils.calculation_sandbox import get_calculation_sandbox
 from agentic_copilot.models.utils.llm_utils import LLMModels
 
 
+def _calculation_variable(value: object) -> object:
+    """Value of a queried variable as the in-process calculation sees it. Frames and Series are shallow copies, with
+    copy-on-write (see configure_pandas) only the data a command modifies is copied. Scalars are passed as they are."""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return value.copy(deep=not pd.get_option("mode.copy_on_write"))
+
+    return value
+
+
 class CalculationAgent(AgentBase):
     id: Speaker = Speaker.CALCULATION.value
+    agent_description = """This agent processes data retrieved by Query agents, stored in a dictionary of type
+        dict[str, DataFrame]. It uses pandas functions and its toolset to compute results efficiently."""
     CALCULATION_DONE = "CALCULATION_DONE"
     CALCULATION_NEED_INPUT = "CALCULATION_NEED_INPUT"
 
@@ -25,7 +45,8 @@ class CalculationAgent(AgentBase):
 
         ### TOOLS AVAILABLE ###
 
-        - **`secure_calculation`**: USE THIS TOOL TO EXECUTE PYTHON CODE SECURELY IN AN INDEPENDENT ENVIRONMENT, SPECIFICALLY FOR PANDAS OPERATIONS ON THE DATAFRAMES PROVIDED.
+        - **CALCULATION PRIMITIVES**: `aggregate`, `diff_of_means`, `growth_rate`, `regression`, `percentile` AND `group_by` (BY `service_month` OR `site_name`). PASS THE NAME OF THE DATAFRAME AND THE PARAMETERS, THE NUMERIC COLUMN IS `value` BY DEFAULT. ALWAYS PREFER THESE TOOLS WHEN THE CALCULATION CAN BE DONE WITH THEM.
+        - **`secure_calculation`**: USE THIS TOOL TO EXECUTE PYTHON CODE SECURELY IN AN INDEPENDENT ENVIRONMENT, SPECIFICALLY FOR PANDAS OPERATIONS ON THE DATAFRAMES PROVIDED. ONLY USE IT WHEN NONE OF THE CALCULATION PRIMITIVES CAN DO THE CALCULATION.
         - **`need_input`**: USE THIS TOOL IF YOU REQUIRE CLARIFICATION FROM THE USER, SUCH AS AMBIGUOUS INSTRUCTIONS OR MISSING INFORMATION.
         - **`done`**: ONCE YOU HAVE COMPLETED THE CALCULATION, USE THIS TOOL TO FINALIZE AND STORE THE RESULT, MAKING IT AVAILABLE TO THE ORCHESTRATOR AGENT.
 
@@ -34,8 +55,9 @@ class CalculationAgent(AgentBase):
         1. **ANALYZE THE USER REQUEST**: THOROUGHLY READ THE USER'S QUERY AND UNDERSTAND WHICH SPECIFIC VALUE OR CALCULATION THEY NEED FROM THE PROVIDED DATAFRAME(S).
         - IF ANY PART OF THE REQUEST IS UNCLEAR, IMMEDIATELY USE THE `need_input` TOOL TO REQUEST CLARIFICATION.
         2. **CHECK DATAFRAME STRUCTURE**: REVIEW THE DATAFRAME(S) PROVIDED, INCLUDING COLUMN NAMES, DATA TYPES, AND ROWS, TO UNDERSTAND THE STRUCTURE AND IDENTIFY RELEVANT DATA FOR THE CALCULATION.
-        3. **USE PANDAS FOR CALCULATIONS**:
-        - CONSTRUCT THE APPROPRIATE PANDAS CODE USING THE `secure_calculation` TOOL TO EXECUTE THE CALCULATION BASED ON THE REQUEST.
+        3. **USE THE CALCULATION PRIMITIVES OR PANDAS FOR CALCULATIONS**:
+        - IF THE CALCULATION IS AN AGGREGATE, A DIFFERENCE OF MEANS, A GROWTH RATE, A TREND (REGRESSION), A PERCENTILE OR AN AGGREGATE PER SERVICE MONTH OR SITE, CALL THE MATCHING PRIMITIVE TOOL. CALL A PRIMITIVE FOR EVERY VALUE THAT WAS ASKED.
+        - OTHERWISE CONSTRUCT THE APPROPRIATE PANDAS CODE USING THE `secure_calculation` TOOL TO EXECUTE THE CALCULATION BASED ON THE REQUEST.
         - IMPORT THE MODULES USED
         - ALWAYS EXECUTE THE CODE WITH ONE TOOL USAGE EVEN WHERE MULTIPLE VALUE WERE ASKED.
         - IF NECESSARY PUT IT IN A JSON LIKE VARIABLE AS KEY-VALUE PAIRS WITH LOGICAL KEY NAMES
@@ -66,13 +88,14 @@ class CalculationAgent(AgentBase):
         - CAREFULLY UNDERSTAND THE TASK AND IDENTIFY THE RELEVANT COLUMNS AND OPERATIONS REQUIRED FROM THE DATAFRAME(S).
         - IF ANYTHING IS UNCLEAR, USE THE `need_input` TOOL TO REQUEST CLARIFICATION.
 
-        2. **PANDAS CALCULATION**:
-        - USE THE `secure_calculation` TOOL TO WRITE AND EXECUTE THE PANDAS CODE THAT SOLVES THE REQUESTED CALCULATION.
+        2. **CALCULATION**:
+        - USE THE CALCULATION PRIMITIVES WITH THE DATAFRAME NAMES FROM THE `DATAFRAME VARIABLE NAMES AND HEADS` SECTION WHEN THEY FIT THE CALCULATION.
+        - OTHERWISE USE THE `secure_calculation` TOOL TO WRITE AND EXECUTE THE PANDAS CODE THAT SOLVES THE REQUESTED CALCULATION.
         - BE SURE TO REFER TO THE VARIABLES FROM THE `DATAFRAME VARIABLE NAMES AND HEADS` SECTION.
         - YOU CAN CALCULATE MULTIPLE VALUES IN ONE CODE AND THEN PUT IT IN A JSON LIKE STRING
 
         3. **VERIFY THE CALCULATION RESULT**:
-        - REVIEW THE OUTPUT FROM THE `secure_calculation` TOOL TO ENSURE IT IS CORRECT AND SATISFIES THE USER'S REQUEST.
+        - REVIEW THE OUTPUT OF THE TOOL TO ENSURE IT IS CORRECT AND SATISFIES THE USER'S REQUEST.
         - IF THE RESULT IS INCORRECT OR AMBIGUOUS, REVISE THE CODE AND RUN AGAIN. IF NEEDED, REQUEST CLARIFICATION USING `need_input`.
 
         4. **FINALIZE WITH `done`**:
@@ -84,7 +107,11 @@ class CalculationAgent(AgentBase):
         **User Request**: "What is difference of the means for the Water Usage and Anti Bribery compliance?"
 
         1. **ANALYZE REQUEST**: The user asks for the average of the `price` column.
-        2. **CALCULATE USING PANDAS**:
+        2. **CALCULATE WITH A PRIMITIVE**:
+        ```python
+            diff_of_means(dataframe_a="water_usage_sikkim_india_106", dataframe_b="anti_bribery_compliance_minnesota_united_states_31")
+        ```
+        3. **OR CALCULATE USING PANDAS**:
         ```python
             command="result = water_usage_sikkim_india_106['value'].mean() - anti_bribery_compliance_minnesota_united_states_31['value'].mean()"
 
@@ -118,13 +145,16 @@ class CalculationAgent(AgentBase):
             command="result = water_usage_sikkim_india_106['value'].mean() - anti_bribery_compliance_minnesota_united_states_31['value'].mean()"
         """  # noqa: E501
         self.logger.info(f"Pandas engine tool was used with command: {command}")
-        dataframes = self.state.queried_data
-
-        code_exec_vars = copy.deepcopy(dataframes)
+        sandbox = get_calculation_sandbox()
 
         try:
-            exec(command, code_exec_vars)
-            self.calculation_result = code_exec_vars["result"]
+            if sandbox is not None:
+                # Runs in a separate process with CPU time and memory limits, only the result is sent back
+                self.calculation_result = sandbox.run(command, self.state)
+            else:
+                code_exec_vars = {name: _calculation_variable(value) for name, value in self.state.queried_data.items()}
+                exec(command, code_exec_vars)
+                self.calculation_result = code_exec_vars["result"]
             self.logger.info(f"Result of the calculation is: {self.calculation_result}")
 
         except Exception as e:
@@ -134,6 +164,9 @@ class CalculationAgent(AgentBase):
                 Error: {str(e)}
             """
 
+        return self._result_message()
+
+    def _result_message(self) -> str:
         return f"""
             Calculation done
             Result:
@@ -141,6 +174,78 @@ class CalculationAgent(AgentBase):
             Check the result of he calculation and call the done tool if you think its correct or try to use this tool again with a different command.
         """  # noqa: E501
 
+    def _run_primitive(self, primitive: Callable, frames: list[str], **arguments) -> str:
+        self.logger.info(f"Calculation primitive {primitive.__name__} was used on {frames} with {arguments}")
+
+        missing = [name for name in frames if name not in self.state.queried_data]
+        if missing:
+            return f"""
+                DataFrames {missing} don't exist, the queried DataFrames are: {list(self.state.queried_data)}
+            """
+
+        try:
+            self.calculation_result = primitive(*(self.state.queried_data[name] for name in frames), **arguments)
+            self.logger.info(f"Result of the calculation is: {self.calculation_result}")
+        except PrimitiveError as e:
+            self.logger.info(f"Calculation primitive rejected its arguments: {str(e)}")
+            return f"""
+                The arguments don't fit the data: {str(e)}
+                Fix the arguments and use the tool again.
+            """
+
+        return self._result_message()
+
+    def aggregate(self, dataframe: str, aggregation: Aggregation, column: str = "value") -> str:
+        """Aggregates a numeric column of a queried DataFrame over every row.
+        aggregation is one of sum, mean, median, min, max, std and count."""
+        return self._run_primitive(
+            calculation_primitives.aggregate, [dataframe], aggregation=aggregation, column=column
+        )
+
+    def diff_of_means(self, dataframe_a: str, dataframe_b: str, column: str = "value") -> str:
+        """Mean of a numeric column in dataframe_a minus its mean in dataframe_b."""
+        return self._run_primitive(calculation_primitives.diff_of_means, [dataframe_a, dataframe_b], column=column)
+
+    def growth_rate(
+        self,
+        dataframe: str,
+        start_month: Optional[str] = None,
+        end_month: Optional[str] = None,
+        aggregation: Aggregation = "sum",
+        column: str = "value",
+    ) -> str:
+        """Relative change (0.1 is 10%) of a column between two service months like APR-2022, the values of a month
+        are aggregated first. Without start_month and end_month the first and the last month of the data are used."""
+        return self._run_primitive(
+            calculation_primitives.growth_rate,
+            [dataframe],
+            start_month=start_month,
+            end_month=end_month,
+            aggregation=aggregation,
+            column=column,
+        )
+
+    def regression(self, dataframe: str, aggregation: Aggregation = "sum", column: str = "value") -> str:
+        """Linear trend of a column over the service months, the values of a month are aggregated first.
+        Returns the change per month (slope), the intercept and the r squared of the fit."""
+        return self._run_primitive(
+            calculation_primitives.regression, [dataframe], aggregation=aggregation, column=column
+        )
+
+    def percentile(self, dataframe: str, q: float, column: str = "value") -> str:
+        """The q-th percentile (between 0 and 100, 50 is the median) of a numeric column of a queried DataFrame."""
+        return self._run_primitive(calculation_primitives.percentile, [dataframe], q=q, column=column)
+
+    def group_by(self, dataframe: str, by: GroupColumn, aggregation: Aggregation = "sum", column: str = "value") -> str:
+        """Aggregates a numeric column for every service_month (in chronological order) or every site_name."""
+        return self._run_primitive(
+            calculation_primitives.group_by, [dataframe], by=by, aggregation=aggregation, column=column
+        )
+
+    async def asecure_calculation(self, command: str) -> str:
+        """Use this tool to do pandas operations on DataFrames queried prior."""
+        return await asyncio.to_thread(self.secure_calculation, command)
+
     def done(self) -> str:
         """Use this tool when you are finished with the calculation."""
         self.logger.info("Calculation done tool has been chosen")
@@ -151,19 +256,23 @@ class CalculationAgent(AgentBase):
 
     @property
     def system_prompt(self) -> str:
-        dataframe_heads = "\n\n".join(f"{df[0]}:\n{df[1].head(2)}" for df in self.state.queried_data.items())
+        dataframe_heads = "\n\n".join(
+            f"{name}:\n{value.head(2) if hasattr(value, 'head') else value}"
+            for name, value in self.state.queried_data.items()
+        )
         self.logger.info(f"Dataframe heads: {dataframe_heads}")
         return self.prompt_template.format(chat_history=self.state.chat_history, dataframe_heads=dataframe_heads)
 
-    @property
+    @cached_property
     def tools(self) -> list[FunctionTool]:
         return [
-            FunctionTool.from_defaults(fn=self.need_input, name="need_input", return_direct=True),
-            FunctionTool.from_defaults(fn=self.secure_calculation, name="secure_calculation"),
-            FunctionTool.from_defaults(fn=self.done, name="done", return_direct=True),
+            self.tool(fn=self.need_input, name="need_input", return_direct=True),
+            self.tool(fn=self.aggregate, name="aggregate"),
+            self.tool(fn=self.diff_of_means, name="diff_of_means"),
+            self.tool(fn=self.growth_rate, name="growth_rate"),
+            self.tool(fn=self.regression, name="regression"),
+            self.tool(fn=self.percentile, name="percentile"),
+            self.tool(fn=self.group_by, name="group_by"),
+            self.tool(fn=self.secure_calculation, async_fn=self.asecure_calculation, name="secure_calculation"),
+            self.tool(fn=self.done, name="done", return_direct=True),
         ]
-
-    @property
-    def agent_description(self) -> str:
-        return """This agent processes data retrieved by Query agents, stored in a dictionary of type
-        dict[str, DataFrame]. It uses pandas functions and its toolset to compute results efficiently."""
@@ -1,19 +1,36 @@
 import re
-from pathlib import Path
+import sys
+import threading
+from collections import OrderedDict
+from typing import Iterable, Optional, TextIO
 
-import pandas as pd
+import numpy as np
 from llama_index.core.schema import TextNode
 
+from agentic_copilot.config import settings
+from agentic_copilot.models.agents.query.datastream_resolver import DatastreamResolver
 from agentic_copilot.models.agents.query.document_query_tool import DocumentQueryTool
+from agentic_copilot.models.utils.agents_util import get_logger
+from agentic_copilot.models.utils.datasets import dataset_registry
 from agentic_copilot.models.utils.llm_utils import LLMModels
 
+logger = get_logger(__name__, stream_output=sys.stdout)
+
 
 class ClientDataStreamMatchingEngine(DocumentQueryTool):
     def __init__(self, client_id: int) -> None:
-        super().__init__(document_name=f"datastream_name_indexes/client{client_id}", model=LLMModels.GPT_4O)
         self.client_id = client_id
-        full_df = pd.read_csv(Path("data/datastreams_full_synth.csv"), encoding="ISO-8859-1")
-        self.ds_names = full_df[full_df["client_id"] == self.client_id][["data_stream"]].drop_duplicates().reset_index()
+        client_df = dataset_registry.client_datastreams(self.client_id)
+        self.ds_names = client_df[["data_stream"]].drop_duplicates().reset_index()
+        super().__init__(document_name=f"datastream_name_indexes/client{client_id}", model=LLMModels.GPT_4O)
+        self.resolver = DatastreamResolver(
+            datastream_names=[str(name) for name in self.ds_names["data_stream"]],
+            embed_model=self.embed_model,
+            name_embeddings=self._stored_name_embeddings(),
+        )
+
+    def _node_id(self, position: int) -> str:
+        return f"datastream_client{self.client_id}_{position}"
 
     def _create_nodes(self) -> list[TextNode]:
         # Making nodes to embed and index for the VectorStoreIndex
@@ -21,11 +38,31 @@ class ClientDataStreamMatchingEngine(DocumentQueryTool):
 
         for datastream in enumerate(self.ds_names.iloc[:, 1:].to_dict(orient="records")):
             text = re.sub("[{}']", "", str(datastream[1]))
-            nodes_ds.append(TextNode(text=text, id_=f"datastream_client{self.client_id}_{datastream[0]}"))
+            nodes_ds.append(TextNode(text=text, id_=self._node_id(datastream[0])))
 
         return nodes_ds
 
+    def _stored_name_embeddings(self) -> Optional[np.ndarray]:
+        """Embeddings of the datastream names from the vector store of the index, so they aren't embedded again.
+        None when the index was built from other datastreams than the client has now."""
+        nodes = self._create_nodes()
+        docstore = self.index.docstore
+        for node in nodes:
+            stored = docstore.get_node(node.node_id, raise_error=False)
+            if stored is None or stored.get_content() != node.get_content():
+                logger.info(f"Datastream index of client {self.client_id} is outdated, names are embedded again")
+                return None
+
+        return self.index.vector_store.get_embeddings([node.node_id for node in nodes])
+
     def match_datastream(self, data_stream_str: str) -> list[str]:
+        matches, decisive = self.resolver.resolve(data_stream_str)
+        if decisive:
+            return [matches[0].name]
+
+        return self.match_datastream_with_llm(data_stream_str)
+
+    def match_datastream_with_llm(self, data_stream_str: str) -> list[str]:
         response = str(
             self.query_engine.query(
                 f"""
@@ -42,3 +79,67 @@ class ClientDataStreamMatchingEngine(DocumentQueryTool):
             return [data_stream_str]
         else:
             return sorted(matches)
+
+
+class ClientEngineCache:
+    """Bounded LRU cache of the loaded per-client matching engines.
+
+    Loading an engine reads the client's whole index from disk, so engines are kept between tool calls and the least
+    recently used client is evicted when the cache is full. Concurrent requests for the same client wait for a single
+    load instead of loading the index several times.
+    """
+
+    def __init__(self, max_size: int = settings.datastream_engine_cache_size, stream_output: TextIO = sys.stdout):
+        self.max_size = max_size
+        self.logger = get_logger(__name__, stream_output=stream_output)
+        self._engines: OrderedDict[int, ClientDataStreamMatchingEngine] = OrderedDict()
+        self._lock = threading.Lock()
+        self._client_locks: dict[int, threading.Lock] = {}
+
+    def get(self, client_id: int | str) -> ClientDataStreamMatchingEngine:
+        client_id = int(client_id)
+
+        with self._lock:
+            if client_id in self._engines:
+                self._engines.move_to_end(client_id)
+                return self._engines[client_id]
+            client_lock = self._client_locks.setdefault(client_id, threading.Lock())
+
+        with client_lock:
+            with self._lock:
+                if client_id in self._engines:
+                    self._engines.move_to_end(client_id)
+                    return self._engines[client_id]
+
+            self.logger.info(f"Loading datastream matching engine for client {client_id}")
+            engine = ClientDataStreamMatchingEngine(client_id)
+
+            with self._lock:
+                self._engines[client_id] = engine
+                while len(self._engines) > self.max_size:
+                    evicted_client, _ = self._engines.popitem(last=False)
+                    self.logger.info(f"Datastream matching engine of client {evicted_client} evicted")
+                self._client_locks.pop(client_id, None)
+
+        return engine
+
+    def is_loaded(self, client_id: int | str) -> bool:
+        return int(client_id) in self._engines
+
+    def prewarm(self, client_ids: Iterable[int]) -> threading.Thread:
+        """Loads the engines of the given clients on a background thread."""
+
+        def load_engines() -> None:
+            for client_id in client_ids:
+                try:
+                    self.get(client_id)
+                except Exception as e:
+                    self.logger.info(f"Couldn't prewarm datastream matching engine of client {client_id}: {str(e)}")
+
+        thread = threading.Thread(target=load_engines, name="datastream-engine-prewarm", daemon=True)
+        thread.start()
+
+        return thread
+
+
+client_engine_cache = ClientEngineCache()
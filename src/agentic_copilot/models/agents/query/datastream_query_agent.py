@@ -1,12 +1,12 @@
 import sys
-from pathlib import Path
+from functools import cached_property
 
 import pandas as pd
 from llama_index.core import PromptTemplate
 from llama_index.core.tools import FunctionTool
 
 from agentic_copilot.models.agents.query.client_datastream_matching_engine import (
-    ClientDataStreamMatchingEngine,
+    client_engine_cache,
 )
 from agentic_copilot.models.utils.agent_base import AgentFrameWork, QueryAgentBase
 from agentic_copilot.models.utils.agents_util import (
@@ -14,11 +14,17 @@ from agentic_copilot.models.utils.agents_util import (
     Speaker,
     get_logger,
 )
+from agentic_copilot.models.utils.datasets import dataset_registry
 from agentic_copilot.models.utils.llm_utils import LLMModels
 
 
 class DataStreamQueryAgent(QueryAgentBase):
     id: str = Speaker.DATASTREAM_QUERY
+    agent_description = """
+            The Datastream Query Agent processes and analyzes user datastreams (HR, Energy, Emissions, etc.), each
+            tied to a service month and value. It supports querying, filtering, and aggregating data for insights
+            like trends, anomalies, and performance metrics.
+        """
     DS_AGENT_NEED_INPUT = "DS_AGENT_NEED_INPUT"
     DS_QUERY_DONE = "DS_QUERY_DONE"
 
@@ -146,19 +152,7 @@ class DataStreamQueryAgent(QueryAgentBase):
         self.logger = get_logger(__name__, stream_output=sys.stdout)
 
     def _create_df(self) -> None:
-        df_full = pd.read_csv(Path("data/datastreams_full_synth.csv"), encoding="ISO-8859-1")
-        df_full_typed = df_full.astype(
-            {
-                "client_id": "int64",
-                "data_stream": "string",
-                "site_name": "string",
-                "state": "string",
-                "country": "string",
-                "service_month": "string",
-                "type": "string",
-            }
-        )
-        self.df = df_full_typed[df_full_typed["client_id"] == int(self.state.user_id)]
+        self.df = dataset_registry.client_datastreams(self.state.user_id)
 
     def need_input(self, question: str) -> tuple[str, str]:
         """Use this tool when you can't answer the query for instance you can't resolve datastream value.
@@ -176,7 +170,7 @@ class DataStreamQueryAgent(QueryAgentBase):
             f"Find datastream tool has been chosen for datastream: {datastream} and user {self.state.user_id}"
         )
 
-        datastream_matching_engine = ClientDataStreamMatchingEngine(self.state.user_id)
+        datastream_matching_engine = client_engine_cache.get(self.state.user_id)
         matched_datastreams = datastream_matching_engine.match_datastream(datastream)
 
         self.logger.info(f"{matched_datastreams}")
@@ -245,14 +239,6 @@ class DataStreamQueryAgent(QueryAgentBase):
             {self.records_str}
         """  # noqa: E501
 
-    @property
-    def agent_description(self) -> str:
-        return """
-            The Datastream Query Agent processes and analyzes user datastreams (HR, Energy, Emissions, etc.), each
-            tied to a service month and value. It supports querying, filtering, and aggregating data for insights
-            like trends, anomalies, and performance metrics.
-        """
-
     @property
     def system_prompt(self) -> str:
         return self.agent_prompt_template.format(
@@ -261,12 +247,12 @@ class DataStreamQueryAgent(QueryAgentBase):
             records=self.records_str,
         )
 
-    @property
+    @cached_property
     def tools(self) -> list[FunctionTool]:
         return [
-            FunctionTool.from_defaults(fn=self.need_input, name="need_input", return_direct=True),
-            FunctionTool.from_defaults(fn=self.find_datastreams, name="find_datastreams"),
-            FunctionTool.from_defaults(fn=self.get_dif_values_of_column, name="get_dif_values_of_column"),
-            FunctionTool.from_defaults(fn=self.pandas_engine, name="pandas_engine"),
-            FunctionTool.from_defaults(fn=self.done, name="done", return_direct=True),
+            self.tool(fn=self.need_input, name="need_input", return_direct=True),
+            self.tool(fn=self.find_datastreams, name="find_datastreams"),
+            self.tool(fn=self.get_dif_values_of_column, name="get_dif_values_of_column"),
+            self.tool(fn=self.pandas_engine, name="pandas_engine"),
+            self.tool(fn=self.done, name="done", return_direct=True),
         ]
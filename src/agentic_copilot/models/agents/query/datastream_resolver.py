@@ -0,0 +1,95 @@
+import re
+from typing import NamedTuple, Optional
+
+import numpy as np
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from rapidfuzz import fuzz, process, utils
+
+
+class DatastreamMatch(NamedTuple):
+    name: str
+    score: float
+    method: str
+
+
+def normalize_name(name: str) -> str:
+    return " ".join(re.sub(r"[^0-9a-z]+", " ", name.casefold()).split())
+
+
+class DatastreamResolver:
+    """Resolves a datastream name typed by the user to the datastreams of a client without calling an LLM.
+
+    Candidates are ranked by exact match, normalized match, fuzzy string similarity and finally by the cosine
+    similarity of the name embeddings. A result is only accepted when the best candidate is clearly ahead of the
+    second one, otherwise the caller is expected to fall back to the LLM. The name embeddings are given by the caller
+    when they are already stored, otherwise they are requested from the embedding model when first needed.
+    """
+
+    FUZZY_ACCEPT_SCORE = 0.9
+    FUZZY_MIN_GAP = 0.1
+    VECTOR_ACCEPT_SCORE = 0.9
+    VECTOR_MIN_GAP = 0.05
+
+    def __init__(
+        self, datastream_names: list[str], embed_model: BaseEmbedding, name_embeddings: Optional[np.ndarray] = None
+    ) -> None:
+        self.datastream_names = list(dict.fromkeys(datastream_names))
+        self.embed_model = embed_model
+        self._normalized: dict[str, list[str]] = {}
+        for name in self.datastream_names:
+            self._normalized.setdefault(normalize_name(name), []).append(name)
+        self._name_embeddings: Optional[np.ndarray] = None
+        if name_embeddings is not None and len(name_embeddings) == len(self.datastream_names):
+            self._name_embeddings = self._unit_rows(name_embeddings)
+
+    @staticmethod
+    def _unit_rows(embeddings: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        return embeddings / np.where(norms == 0, 1, norms)
+
+    @property
+    def name_embeddings(self) -> np.ndarray:
+        if self._name_embeddings is None:
+            embeddings = np.asarray(self.embed_model.get_text_embedding_batch(self.datastream_names), dtype=np.float32)
+            self._name_embeddings = self._unit_rows(embeddings)
+
+        return self._name_embeddings
+
+    def fuzzy_matches(self, query: str, limit: int = 10) -> list[DatastreamMatch]:
+        matches = process.extract(
+            query, self.datastream_names, scorer=fuzz.WRatio, processor=utils.default_process, limit=limit
+        )
+        return [DatastreamMatch(name, score / 100, "fuzzy") for name, score, _ in matches]
+
+    def vector_matches(self, query: str, limit: int = 10) -> list[DatastreamMatch]:
+        query_embedding = np.asarray(self.embed_model.get_query_embedding(query), dtype=np.float32)
+        similarities = self.name_embeddings @ (query_embedding / np.linalg.norm(query_embedding))
+        top = np.argsort(-similarities)[:limit]
+
+        return [DatastreamMatch(self.datastream_names[i], float(similarities[i]), "vector") for i in top]
+
+    @staticmethod
+    def _is_decisive(matches: list[DatastreamMatch], accept_score: float, min_gap: float) -> bool:
+        if not matches or matches[0].score < accept_score:
+            return False
+
+        return len(matches) == 1 or matches[0].score - matches[1].score >= min_gap
+
+    def resolve(self, query: str, limit: int = 10) -> tuple[list[DatastreamMatch], bool]:
+        """Ranked candidates for the query and whether the best one can be accepted without asking the LLM."""
+        if query in self.datastream_names:
+            return [DatastreamMatch(query, 1.0, "exact")], True
+
+        normalized = self._normalized.get(normalize_name(query), [])
+        if len(normalized) == 1:
+            return [DatastreamMatch(normalized[0], 1.0, "normalized")], True
+
+        fuzzy = self.fuzzy_matches(query, limit=limit)
+        if self._is_decisive(fuzzy, self.FUZZY_ACCEPT_SCORE, self.FUZZY_MIN_GAP):
+            return fuzzy, True
+
+        vector = self.vector_matches(query, limit=limit)
+        if self._is_decisive(vector, self.VECTOR_ACCEPT_SCORE, self.VECTOR_MIN_GAP):
+            return vector, True
+
+        return vector, False
@@ -1,16 +1,17 @@
 from abc import ABC, abstractmethod
 from pathlib import Path
 
-from llama_index.core import Settings as llama_settings
 from llama_index.core import StorageContext, VectorStoreIndex, load_index_from_storage
 from llama_index.core.base.base_query_engine import BaseQueryEngine
 from llama_index.core.schema import TextNode
+from llama_index.core.vector_stores import SimpleVectorStore
 
 from agentic_copilot.models.utils.llm_utils import (
     LLMModels,
     embedding_factory_function,
     llm_factory_function,
 )
+from agentic_copilot.models.utils.numpy_vector_store import NumpyVectorStore
 
 
 class DocumentQueryTool(ABC):
@@ -20,9 +21,12 @@ class DocumentQueryTool(ABC):
         self.document_name = document_name
         self.similarity_top_k = similarity_top_k
 
-        llama_settings.llm = llm_factory_function(model=model)
-        llama_settings.embed_model = embedding_factory_function()
+        # The models are handed to the index and the engine explicitly instead of overwriting llama-index's global
+        # Settings, so engines built for different models can live side by side
+        self.llm = llm_factory_function(model=model)
+        self.embed_model = embedding_factory_function()
 
+        self.index = self._build_index()
         self.query_engine = self._create_engine()
 
     @abstractmethod
@@ -32,22 +36,36 @@ class DocumentQueryTool(ABC):
     def _create_storage_context(self) -> VectorStoreIndex:
         nodes = self._create_nodes()
 
-        index = VectorStoreIndex(nodes=nodes, embed_model=embedding_factory_function())
+        storage_context = StorageContext.from_defaults(vector_store=NumpyVectorStore())
+        index = VectorStoreIndex(nodes=nodes, storage_context=storage_context, embed_model=self.embed_model)
         index.storage_context.persist(Path(f"data/{self.document_name}"))
 
         return index
 
+    def _load_vector_store(self, persist_dir: Path) -> NumpyVectorStore:
+        if not NumpyVectorStore.exists(persist_dir):
+            # Indexes persisted before the numpy store was introduced are converted once
+            simple_store = SimpleVectorStore.from_persist_dir(persist_dir)
+            NumpyVectorStore.from_simple_vector_store(simple_store).persist(
+                str(persist_dir.joinpath("default__vector_store.json"))
+            )
+
+        return NumpyVectorStore.from_persist_dir(persist_dir)
+
     def _build_index(self) -> VectorStoreIndex:
         index = None
+        persist_dir = Path(f"data/{self.document_name}")
 
-        if not Path(f"./data/{self.document_name}/index_store.json").exists():
+        if not persist_dir.joinpath("index_store.json").exists():
             index = self._create_storage_context()
 
         else:
-            storage_context = StorageContext.from_defaults(persist_dir=Path(f"data/{self.document_name}"))
-            index = load_index_from_storage(storage_context)
+            storage_context = StorageContext.from_defaults(
+                persist_dir=persist_dir, vector_store=self._load_vector_store(persist_dir)
+            )
+            index = load_index_from_storage(storage_context, embed_model=self.embed_model)
 
         return index
 
     def _create_engine(self) -> BaseQueryEngine:
-        return self._build_index().as_query_engine(similarity_top_k=self.similarity_top_k)
+        return self.index.as_query_engine(llm=self.llm, similarity_top_k=self.similarity_top_k)
@@ -1,3 +1,4 @@
+import threading
 from pathlib import Path
 
 from llama_index.core.node_parser import SentenceSplitter
@@ -33,3 +34,25 @@ class ESGQueryEngine(DocumentQueryTool):
             {query}
         """
         )
+
+
+_esg_engines: dict[LLMModels, ESGQueryEngine] = {}
+_esg_engines_lock = threading.Lock()
+
+
+def get_esg_query_engine(model: LLMModels = LLMModels.GPT_4O) -> ESGQueryEngine:
+    """Returns the process-wide ESG engine of the model, the index is only loaded the first time.
+    Querying doesn't modify the engine, so it can be shared between concurrent sessions."""
+    engine = _esg_engines.get(model)
+    if engine is None:
+        with _esg_engines_lock:
+            engine = _esg_engines.get(model)
+            if engine is None:
+                engine = ESGQueryEngine(model=model)
+                _esg_engines[model] = engine
+
+    return engine
+
+
+def is_esg_query_engine_loaded(model: LLMModels = LLMModels.GPT_4O) -> bool:
+    return model in _esg_engines
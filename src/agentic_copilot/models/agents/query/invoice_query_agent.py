@@ -1,7 +1,6 @@
 import sys
-from pathlib import Path
+from functools import cached_property
 
-import pandas as pd
 from llama_index.core import PromptTemplate
 from llama_index.core.tools import FunctionTool
 
@@ -11,11 +10,17 @@ from agentic_copilot.models.utils.agents_util import (
     Speaker,
     get_logger,
 )
+from agentic_copilot.models.utils.datasets import dataset_registry
 from agentic_copilot.models.utils.llm_utils import LLMModels
 
 
 class InvoiceQueryAgent(QueryAgentBase):
     id: str = Speaker.INVOICE_QUERY
+    agent_description = """
+        This agent queries invoice records, including their status (POSTED, IN-PROCESS, PROCESSED, SUBMITTED),
+        unique invoice names, and associated site details (country, state). Invoices are issued monthly at a site
+        and submitted by an employee.
+        """
     INVOICE_QUERY_NEED_INPUT = "INVOICE_QUERY_NEED_INPUT"
     INVOICE_QUERY_DONE = "INVOICE_QUERY_DONE"
 
@@ -132,18 +137,7 @@ class InvoiceQueryAgent(QueryAgentBase):
     )
 
     def _create_df(self) -> None:
-        df_full = pd.read_csv(Path("data/synth_invoice_data_v2.csv"), encoding="ISO-8859-1")
-        self.df = df_full.astype(
-            {
-                "site_name": "string",
-                "state": "string",
-                "country": "string",
-                "service_month": "string",
-                "invoice_name": "string",
-                "submitted_by": "string",
-                "status": "string",
-            }
-        )
+        self.df = dataset_registry.invoices
 
     def _get_attribs_with_values(self) -> str:
         return "\n".join(
@@ -214,20 +208,12 @@ class InvoiceQueryAgent(QueryAgentBase):
         {self.records_str}
         """
 
-    @property
-    def agent_description(self) -> str:
-        return """
-        This agent queries invoice records, including their status (POSTED, IN-PROCESS, PROCESSED, SUBMITTED),
-        unique invoice names, and associated site details (country, state). Invoices are issued monthly at a site
-        and submitted by an employee.
-        """
-
-    @property
+    @cached_property
     def tools(self) -> list[FunctionTool]:
         return [
-            FunctionTool.from_defaults(fn=self.need_input, name="need_input", return_direct=True),
-            FunctionTool.from_defaults(fn=self.pandas_engine, name="pandas_engine"),
-            FunctionTool.from_defaults(fn=self.done, name="done", return_direct=True),
+            self.tool(fn=self.need_input, name="need_input", return_direct=True),
+            self.tool(fn=self.pandas_engine, name="pandas_engine"),
+            self.tool(fn=self.done, name="done", return_direct=True),
         ]
 
     @property
@@ -1,7 +1,7 @@
 import sys
+from functools import cached_property
 
 from llama_index.core import PromptTemplate
-from llama_index.core.tools import FunctionTool
 
 from agentic_copilot.models.agents.query.datastream_query_agent import (
     DataStreamQueryAgent,
@@ -19,6 +19,15 @@ from agentic_copilot.models.utils.llm_utils import LLMModels
 
 class QueryOrchestratorAgent(AgentBase):
     id: str = Speaker.QUERY_ORCHESTRATOR.value
+    agent_description = """
+        This agent routes queries to the appropriate query agents:
+        1.	Invoice Query Agent: Handles queries about invoices, including their status, unique invoice names,
+            and related site details (country, state).
+        2.	Datastream Query Agent: Processes and analyzes datastreams (HR, Energy, Emissions) to provide insights,
+            trends, and performance metrics.
+
+        It ensures queries are directed to the correct agent based on the data type.
+        """
 
     QUERY_DONE = "QUERY_DONE"
     QUERY_NEED_INPUT = "QUERY_NEED_INPUT"
@@ -115,7 +124,10 @@ class QueryOrchestratorAgent(AgentBase):
     ) -> None:
         super().__init__(state=state, model=model, agent_framework=agent_framework, cli_print=cli_print)
         self.logger = get_logger(name=__name__, stream_output=sys.stdout)
-        self.query_agents: dict[str, QueryAgentBase] = {
+
+    @cached_property
+    def query_agents(self) -> dict[str, QueryAgentBase]:
+        return {
             DataStreamQueryAgent.id: DataStreamQueryAgent(state=self.state),
             InvoiceQueryAgent.id: InvoiceQueryAgent(state=self.state),
         }
@@ -136,6 +148,19 @@ class QueryOrchestratorAgent(AgentBase):
 
         self.state.chat_history.append(f"QueryOrchestrator agent to DataStreamQueryAgent: {instruction}")
         response_status, response_message = eval_response(self.query_agents[DataStreamQueryAgent.id].chat(instruction))
+
+        return self._datastream_query_result(response_status, response_message)
+
+    async def achoose_datastream_query_agent(self, instruction: str) -> str:
+        """Choose this tool to delegate question to DataStreamQuery agent."""
+        self.logger.info(f"Query for datastreams tool has been chosen! query: {instruction}")
+
+        self.state.chat_history.append(f"QueryOrchestrator agent to DataStreamQueryAgent: {instruction}")
+        response_status, response_message = await self.query_agents[DataStreamQueryAgent.id].achat(instruction)
+
+        return self._datastream_query_result(response_status, response_message)
+
+    def _datastream_query_result(self, response_status: str, response_message: str) -> str:
         message = ""
         if response_status == str(DataStreamQueryAgent.DS_QUERY_DONE):
             message = f"""
@@ -161,6 +186,19 @@ class QueryOrchestratorAgent(AgentBase):
 
         self.state.chat_history.append(f"QueryOrchestrator agent to InvoiceQueryAgent: {instruction}")
         response_status, response_message = eval_response(self.query_agents[InvoiceQueryAgent.id].chat(instruction))
+
+        return self._invoice_query_result(response_status, response_message)
+
+    async def achoose_invoice_query_agent(self, instruction: str) -> str:
+        """Choose this tool when you want to delegate a query for an invoice record"""
+        self.logger.info(f"Choose invoice query agent tool has been chosen with instruction: {instruction}")
+
+        self.state.chat_history.append(f"QueryOrchestrator agent to InvoiceQueryAgent: {instruction}")
+        response_status, response_message = await self.query_agents[InvoiceQueryAgent.id].achat(instruction)
+
+        return self._invoice_query_result(response_status, response_message)
+
+    def _invoice_query_result(self, response_status: str, response_message: str) -> str:
         message = ""
         if response_status == str(InvoiceQueryAgent.INVOICE_QUERY_DONE):
             message = f"""
@@ -189,13 +227,21 @@ class QueryOrchestratorAgent(AgentBase):
 
         return (str(self.QUERY_DONE), "")
 
-    @property
+    @cached_property
     def tools(self):
         return [
-            FunctionTool.from_defaults(fn=self.choose_datastream_query_agent, name="choose_datastream_query_agent"),
-            FunctionTool.from_defaults(fn=self.choose_invoice_query_agent, name="choose_invoice_query_agent"),
-            FunctionTool.from_defaults(fn=self.done, name="from_defaults", return_direct=True),
-            FunctionTool.from_defaults(fn=self.need_input, name="need_input", return_direct=True),
+            self.tool(
+                fn=self.choose_datastream_query_agent,
+                async_fn=self.achoose_datastream_query_agent,
+                name="choose_datastream_query_agent",
+            ),
+            self.tool(
+                fn=self.choose_invoice_query_agent,
+                async_fn=self.achoose_invoice_query_agent,
+                name="choose_invoice_query_agent",
+            ),
+            self.tool(fn=self.done, name="from_defaults", return_direct=True),
+            self.tool(fn=self.need_input, name="need_input", return_direct=True),
         ]
 
     @property
@@ -205,19 +251,7 @@ class QueryOrchestratorAgent(AgentBase):
         )
 
         return self.prompt_template.format(
-            state_representation=self.state.get_json(),
+            state_representation=self.state.get_state_string(),
             agent_descriptions=query_agent_descriptions,
             few_shot_examples=self.few_shot_examples,
         )
-
-    @property
-    def agent_description(self) -> str:
-        return """
-        This agent routes queries to the appropriate query agents:
-        1.	Invoice Query Agent: Handles queries about invoices, including their status, unique invoice names,
-            and related site details (country, state).
-        2.	Datastream Query Agent: Processes and analyzes datastreams (HR, Energy, Emissions) to provide insights,
-            trends, and performance metrics.
-
-        It ensures queries are directed to the correct agent based on the data type.
-        """
@@ -1,20 +1,24 @@
-from llama_index.core.base.llms.types import ChatMessage
+from typing import Optional
+
 from pydantic import BaseModel
 
 
 class AgentResponseState(BaseModel):
-    chat_history: list[ChatMessage]
+    chat_history: list[str]
     plan: list[tuple[str, str]]
-    current_step: int
+    current_step: Optional[int]
     # data: DataFrame
 
 
 class AgentRequest(BaseModel):
     utterance: str
-    state: AgentResponseState
+    user_id: str
+    # A new session is started when it's missing or the session has expired
+    session_id: Optional[str] = None
 
 
 class AgentResponse(BaseModel):
+    session_id: str
     base_utterance: str
     answer: str
     state: AgentResponseState
@@ -1,11 +1,9 @@
 from abc import ABC, abstractmethod
 from enum import Enum
-from typing import Callable, List
+from typing import TYPE_CHECKING, Callable, List, Optional
 
 from llama_index.core import PromptTemplate
 from llama_index.core.llms import ChatMessage, MessageRole
-from llama_index.core.agent import FunctionCallingAgent, ReActAgent, AgentRunner
-from llama_index.agent.lats import LATSAgentWorker
 from llama_index.core.callbacks import CallbackManager
 from llama_index.core.llms.function_calling import FunctionCallingLLM
 
@@ -17,7 +15,11 @@ from agentic_copilot.models.utils.llm_utils import (
 )
 
 
-from llama_index.core.tools import FunctionTool
+from llama_index.core.tools import FunctionTool, ToolMetadata
+
+# The agent frameworks are imported by the factories on first use, most agents never need the heavier ones
+if TYPE_CHECKING:
+    from llama_index.core.agent import AgentRunner
 
 
 class AgentFrameWork(str, Enum):
@@ -51,6 +53,8 @@ def base_prompt_agent_factory(
     callback_manager: CallbackManager,
     model: LLMModels = LLMModels.GPT_4O,
 ):
+    from llama_index.core.agent import FunctionCallingAgent
+
     chat_history = [ChatMessage(role=MessageRole.SYSTEM, content=BASE_TEMPLATE.format(state_str=state_string))]
     return FunctionCallingAgent.from_tools(
         llm=llm_factory_function(model=model),
@@ -68,6 +72,8 @@ def function_calling_factory(
     callback_manager: CallbackManager,
     model: LLMModels = LLMModels.GPT_4O,
 ):
+    from llama_index.core.agent import FunctionCallingAgent
+
     return FunctionCallingAgent.from_tools(
         system_prompt=system_prompt,
         llm=llm_factory_function(model=model),
@@ -84,6 +90,8 @@ def react_factory(
     callback_manager: CallbackManager,
     model: LLMModels = LLMModels.GPT_4O,
 ):
+    from llama_index.core.agent import ReActAgent
+
     chat_history = [ChatMessage(role=MessageRole.SYSTEM, content=BASE_TEMPLATE.format(state_str=state_string))]
     return ReActAgent.from_tools(
         llm=llm_factory_function(model=model),
@@ -101,13 +109,15 @@ def lats_factory(
     callback_manager: CallbackManager,
     model: LLMModels = LLMModels.GPT_4O,
 ):
+    from llama_index.agent.lats import LATSAgentWorker
+
     chat_history = [ChatMessage(role=MessageRole.SYSTEM, content=BASE_TEMPLATE.format(state_str=state_string))]
     return LATSAgentWorker.from_tools(
         llm=llm_factory_function(model=model), tools=tools, callback_manager=callback_manager, chat_history=chat_history
     ).as_agent()
 
 
-FRAMEWORK_MAPPING: dict[AgentFrameWork, Callable[[str, List, LLMModels], AgentRunner]] = {
+FRAMEWORK_MAPPING: dict[AgentFrameWork, Callable[[str, List, LLMModels], "AgentRunner"]] = {
     AgentFrameWork.BASE: base_prompt_agent_factory,
     AgentFrameWork.PROMPT: function_calling_factory,
     AgentFrameWork.REACT: react_factory,
@@ -115,10 +125,22 @@ FRAMEWORK_MAPPING: dict[AgentFrameWork, Callable[[str, List, LLMModels], AgentRu
 }
 
 
+# Metadata (name, description and the JSON schema of the arguments) of the tools, built once for every agent class
+_tool_metadata_cache: dict[tuple, ToolMetadata] = {}
+
+
+def _has_abstract_methods(cls: type) -> bool:
+    # ABCMeta only sets __abstractmethods__ after __init_subclass__ ran, so it is computed the same way here
+    names = set(vars(cls)).union(*(getattr(base, "__abstractmethods__", ()) for base in cls.__bases__))
+    return any(getattr(getattr(cls, name, None), "__isabstractmethod__", False) for name in names)
+
+
 class AgentBase(ABC):
     """Abstract base class for agents"""
 
     id: str
+    # Class level, so other agents can describe an agent without building it
+    agent_description: str
 
     def __init__(
         self,
@@ -138,6 +160,11 @@ class AgentBase(ABC):
         self.prompt_tokens = 0
         self.total_tokens = 0
 
+    def __init_subclass__(cls, **kwargs) -> None:
+        super().__init_subclass__(**kwargs)
+        if not _has_abstract_methods(cls) and not isinstance(getattr(cls, "agent_description", None), str):
+            raise TypeError(f"Agent {cls.__name__} must define agent_description as a class attribute")
+
     def chat(self, message: str) -> str:
         agent = self.agent_factory()
         response = agent.chat(message)
@@ -150,10 +177,25 @@ class AgentBase(ABC):
 
         return response
 
-    @property
-    @abstractmethod
-    def agent_description(self) -> str:
-        pass
+    def tool(
+        self,
+        fn: Callable,
+        name: str,
+        description: Optional[str] = None,
+        return_direct: bool = False,
+        async_fn: Optional[Callable] = None,
+    ) -> FunctionTool:
+        """Tool of a method of the agent. Its schema only depends on the signature and the docstring of the method, so
+        it is only built for the first instance of the agent class."""
+        key = (type(self), name, fn.__name__, description, return_direct)
+        metadata = _tool_metadata_cache.get(key)
+        if metadata is None:
+            metadata = FunctionTool.from_defaults(
+                fn=fn, name=name, description=description, return_direct=return_direct
+            ).metadata
+            _tool_metadata_cache[key] = metadata
+
+        return FunctionTool.from_defaults(fn=fn, async_fn=async_fn, tool_metadata=metadata)
 
     @property
     @abstractmethod
@@ -165,7 +207,7 @@ class AgentBase(ABC):
     def system_prompt(self) -> str:
         pass
 
-    def agent_factory(self) -> AgentRunner:
+    def agent_factory(self) -> "AgentRunner":
         return FRAMEWORK_MAPPING[self.agent_framework](
             state_string=self.state.get_state_string(),
             system_prompt=self.system_prompt,
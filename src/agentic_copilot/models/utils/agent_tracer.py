@@ -1,12 +1,10 @@
-import json
 from llama_index.core.callbacks.base_handler import BaseCallbackHandler
 
 from typing import Any, Dict, List, Optional
 from llama_index.core.callbacks.schema import CBEventType
-import requests
 
 from colorama import Fore, Style
-from agentic_copilot.models.utils.llm_utils import LLMModels
+from agentic_copilot.models.utils.llm_utils import price_registry
 
 blue = "\033[1;34m"
 yellow = "\033[33m"
@@ -18,17 +16,6 @@ yellow = "\033[33m"
 end = "\033[0m"
 
 
-response = requests.get("http://0.0.0.0:4000/v1/model/info")
-json_prices = json.loads(response.content.decode("utf-8"))
-PRICES = {
-    model["model_name"]: {
-        "output_price": model["model_info"]["output_price"],
-        "input_price": model["model_info"]["input_price"],
-    }
-    for model in json_prices["data"]
-}
-
-
 class AgentTracer(BaseCallbackHandler):
     def __init__(self, model, cli_print: bool = True):
         super().__init__([], [])
@@ -152,6 +139,10 @@ class AgentTracer(BaseCallbackHandler):
 
     @property
     def price(self) -> float:
-        input_price = PRICES[self.model.value]["input_price"]
-        output_price = PRICES[self.model.value]["output_price"]
+        prices = price_registry.get(self.model.value)
+        if prices is None:
+            return float("nan")
+
+        input_price = prices["input_price"]
+        output_price = prices["output_price"]
         return (input_price * self.input_tokens + output_price * self.output_tokens) * 0.000001
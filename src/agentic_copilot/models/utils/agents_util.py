@@ -1,12 +1,15 @@
+import copy
 import json
-import logging
 from enum import Enum
-from pathlib import Path
-from typing import Optional, TextIO
+from typing import Callable, Optional
 
 from pandas import DataFrame
 from pydantic import FilePath
 
+# get_logger lives in a module without pandas, it is re-exported for the agents importing it from here
+from agentic_copilot.models.utils.logging_util import get_logger  # noqa: F401
+from agentic_copilot.models.utils.state_renderer import state_renderer
+
 
 class Speaker(str, Enum):
     CALCULATION = "calculation_agent"
@@ -18,17 +21,312 @@ class Speaker(str, Enum):
     RESEARCH_AGENT = "research_agent"
 
 
+class TrackedList(list):
+    """List that notifies its owner whenever it is modified in place. Copies of it are plain lists."""
+
+    def __init__(self, items=(), on_change: Optional[Callable[[], None]] = None) -> None:
+        super().__init__(items)
+        self._on_change = on_change
+
+    def __copy__(self) -> list:
+        return list(self)
+
+    def __deepcopy__(self, memo: dict) -> list:
+        return copy.deepcopy(list(self), memo)
+
+    def __reduce__(self):
+        return list, (list(self),)
+
+
+class LazyValue:
+    """Placeholder of a dictionary value that is only built when it is first read, source is what it's built from.
+    With a fragment_kind the source is also the serialized form of that kind of the built value."""
+
+    def __init__(self, load: Callable[[], object], source: object = None, fragment_kind: Optional[str] = None) -> None:
+        self.load = load
+        self.source = source
+        self.fragment_kind = fragment_kind
+
+
+class TrackedDict(dict):
+    """Dictionary that notifies its owner whenever it is modified in place. Copies of it are plain dictionaries.
+    Values stored as LazyValue placeholders are built on first read, replacing a placeholder isn't a modification."""
+
+    def __init__(
+        self,
+        items=(),
+        on_change: Optional[Callable[[], None]] = None,
+        on_resolve: Optional[Callable[[object, LazyValue, object], None]] = None,
+    ) -> None:
+        super().__init__(items)
+        self._on_change = on_change
+        self._on_resolve = on_resolve
+
+    def raw_get(self, key, default=None):
+        """Value of the key without building it, a LazyValue if it wasn't read yet."""
+        return dict.get(self, key, default)
+
+    def _resolve(self, key, value):
+        if isinstance(value, LazyValue):
+            placeholder, value = value, value.load()
+            dict.__setitem__(self, key, value)
+            if self._on_resolve is not None:
+                self._on_resolve(key, placeholder, value)
+        return value
+
+    def _resolve_all(self) -> None:
+        for key, value in list(dict.items(self)):
+            self._resolve(key, value)
+
+    def __getitem__(self, key):
+        return self._resolve(key, dict.__getitem__(self, key))
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def pop(self, key, *default):
+        if key in self:
+            self[key]
+        return dict.pop(self, key, *default)
+
+    def popitem(self):
+        key, value = dict.popitem(self)
+        return key, value.load() if isinstance(value, LazyValue) else value
+
+    def setdefault(self, key, default=None):
+        if key in self:
+            return self[key]
+        return dict.setdefault(self, key, default)
+
+    def items(self):
+        self._resolve_all()
+        return dict.items(self)
+
+    def values(self):
+        self._resolve_all()
+        return dict.values(self)
+
+    def copy(self) -> dict:
+        return self.__copy__()
+
+    def __repr__(self) -> str:
+        self._resolve_all()
+        return dict.__repr__(self)
+
+    def __copy__(self) -> dict:
+        return dict(self.items())
+
+    def __deepcopy__(self, memo: dict) -> dict:
+        return copy.deepcopy(dict(self.items()), memo)
+
+    def __reduce__(self):
+        return dict, (dict(self.items()),)
+
+
+def _notifying(method: Callable) -> Callable:
+    def notify(self, *args, **kwargs):
+        result = method(self, *args, **kwargs)
+        if self._on_change is not None:
+            self._on_change()
+        return result
+
+    return notify
+
+
+for _name in ("append", "extend", "insert", "pop", "remove", "clear", "sort", "reverse"):
+    setattr(TrackedList, _name, _notifying(getattr(list, _name)))
+for _name in ("__setitem__", "__delitem__", "__iadd__", "__imul__"):
+    setattr(TrackedList, _name, _notifying(getattr(list, _name)))
+for _name in ("__setitem__", "__delitem__", "pop", "popitem", "clear", "update", "setdefault", "__ior__"):
+    setattr(TrackedDict, _name, _notifying(getattr(TrackedDict, _name)))
+
+
+class NestedTrackedList(TrackedList):
+    """TrackedList of lists, the inner lists are tracked as well, so e.g. appending to one of them notifies too."""
+
+    def __init__(self, items=(), on_change: Optional[Callable[[], None]] = None) -> None:
+        super().__init__(on_change=on_change)
+        list.extend(self, map(self._tracked, items))
+
+    def _tracked(self, item):
+        return TrackedList(item, on_change=self._on_change) if isinstance(item, list) else item
+
+    def append(self, item) -> None:
+        super().append(self._tracked(item))
+
+    def insert(self, index, item) -> None:
+        super().insert(index, self._tracked(item))
+
+    def extend(self, items) -> None:
+        super().extend(map(self._tracked, items))
+
+    def __iadd__(self, items):
+        return super().__iadd__(list(map(self._tracked, items)))
+
+    def __setitem__(self, index, item) -> None:
+        if isinstance(index, slice):
+            super().__setitem__(index, list(map(self._tracked, item)))
+        else:
+            super().__setitem__(index, self._tracked(item))
+
+
+# List fields whose items are lists modified in place
+NESTED_LIST_FIELDS = {"plan_dependencies"}
+
+# Fields of the state in the order of its JSON representation, with their JSON keys
+STATE_FIELDS = {
+    "user_id": "client_id",
+    "base_utterance": "base_utterance",
+    "plan": "plan",
+    "plan_dependencies": "plan_dependencies",
+    "completed_steps": "completed_steps",
+    "research_results": "research_results",
+    "queried_data": "queried_data",
+    "chat_history": "chat_history",
+    "current_step": "current_step",
+    "calculation_results": "calculation_results",
+}
+
+
+def _queried_value_json(value) -> str:
+    # Besides frames pandas_engine may store a Series or a (numpy) scalar
+    if hasattr(value, "to_dict"):
+        value = value.to_dict()
+    elif hasattr(value, "item"):
+        value = value.item()
+    return json.dumps(value)
+
+
 class AgentsState(object):
+    """State of a conversation shared by every agent.
+
+    Every field keeps a version that is bumped on assignment and on in-place modification of the list and dictionary
+    fields (and of the inner lists of plan_dependencies), the serialized form of each field (and of each queried frame)
+    is cached for its version. Frames in queried_data are expected to be replaced, not modified in place, the cached
+    fragments of a frame are dropped when it is.
+    """
+
     def __init__(self, user_id) -> None:
+        object.__setattr__(self, "version", 0)
+        object.__setattr__(self, "_field_versions", dict.fromkeys(STATE_FIELDS, 0))
+        object.__setattr__(self, "_fragments", {})
+        object.__setattr__(self, "_frame_fragments", {})
+        object.__setattr__(self, "_rendered", None)
+
         self.user_id = user_id
         self.base_utterance = None
         self.plan = []
+        # Indices of the steps each plan step depends on, steps without an entry depend on every earlier step
+        self.plan_dependencies: list[list[int]] = []
+        self.completed_steps: list[int] = []
         self.research_results: list[str] = []
         self.queried_data: dict[str, DataFrame] = {}
         self.chat_history = []
         self.current_step: Optional[int] = None
         self.calculation_results: list[str] = []
 
+    def __setattr__(self, name: str, value) -> None:
+        if name in STATE_FIELDS:
+            if type(value) is list or isinstance(value, TrackedList):
+                tracked_list = NestedTrackedList if name in NESTED_LIST_FIELDS else TrackedList
+                value = tracked_list(value, on_change=lambda: self._touch(name))
+            elif type(value) is dict or isinstance(value, TrackedDict):
+                # Placeholders that weren't read yet are carried over as they are, the state reading one caches it
+                value = TrackedDict(
+                    dict.items(value),
+                    on_change=lambda: self._touch(name),
+                    on_resolve=self._frame_loaded if name == "queried_data" else None,
+                )
+            object.__setattr__(self, name, value)
+            self._touch(name)
+        else:
+            object.__setattr__(self, name, value)
+
+    def __getstate__(self) -> dict:
+        return {field: getattr(self, field) for field in STATE_FIELDS}
+
+    def __setstate__(self, fields: dict) -> None:
+        self.__init__(fields["user_id"])
+        for field, value in fields.items():
+            setattr(self, field, value)
+
+    def _touch(self, field: str) -> None:
+        self._field_versions[field] += 1
+        object.__setattr__(self, "version", self.version + 1)
+        if field == "queried_data":
+            # Fragments of removed or replaced frames would otherwise keep the frames alive
+            self.prune_frame_fragments()
+
+    def field_version(self, field: str) -> int:
+        return self._field_versions[field]
+
+    def frame_fragment(self, name: str, kind: str, build: Callable[[DataFrame], str]) -> str:
+        """Serialized form of a queried frame, built once for every frame object."""
+        df = self.queried_data[name]
+        cached = self._frame_fragments.get((name, kind))
+        if cached is None or cached[0] is not df:
+            cached = (df, build(df))
+            self._frame_fragments[(name, kind)] = cached
+
+        return cached[1]
+
+    def prune_frame_fragments(self) -> None:
+        """Drops the cached fragments of the frames that were replaced or removed since."""
+        for key, (df, _) in list(self._frame_fragments.items()):
+            if self.queried_data.raw_get(key[0]) is not df:
+                del self._frame_fragments[key]
+
+    def cache_frame_fragment(self, name: str, kind: str, df: DataFrame, fragment) -> None:
+        """Registers the serialized form a frame was loaded from, so it isn't serialized again while unchanged."""
+        self._frame_fragments[(name, kind)] = (df, fragment)
+
+    def _frame_loaded(self, name: str, placeholder: LazyValue, df: DataFrame) -> None:
+        if placeholder.fragment_kind is not None:
+            self.cache_frame_fragment(name, placeholder.fragment_kind, df, placeholder.source)
+
+    def json_fragment(self, field: str) -> str:
+        version = self._field_versions[field]
+        cached = self._fragments.get(field)
+
+        if cached is None or cached[0] != version:
+            if field == "queried_data":
+                fragment = (
+                    "{"
+                    + ", ".join(
+                        f"{json.dumps(name)}: {self.frame_fragment(name, 'json', _queried_value_json)}"
+                        for name in self.queried_data
+                    )
+                    + "}"
+                )
+            else:
+                fragment = json.dumps(getattr(self, field))
+            cached = (version, fragment)
+            self._fragments[field] = cached
+
+        return cached[1]
+
+    def snapshot(self) -> "AgentsState":
+        """Copy of the state that can be modified independently. The frames are shared (copy-on-write) and so are
+        the serialized fragments, which stay valid until either copy changes."""
+        state = AgentsState(self.user_id)
+        for field in STATE_FIELDS:
+            value = getattr(self, field)
+            if field == "plan_dependencies":
+                value = [list(dependencies) for dependencies in value]
+            elif isinstance(value, dict):
+                value = dict(dict.items(value))
+            elif isinstance(value, list):
+                value = list(value)
+            setattr(state, field, value)
+
+        object.__setattr__(state, "version", self.version)
+        object.__setattr__(state, "_field_versions", dict(self._field_versions))
+        object.__setattr__(state, "_fragments", dict(self._fragments))
+        object.__setattr__(state, "_frame_fragments", dict(self._frame_fragments))
+        object.__setattr__(state, "_rendered", self._rendered)
+
+        return state
+
     def get_current_step(self) -> tuple[str, str]:
         if self.current_step is None:
             return ()
@@ -43,6 +341,35 @@ class AgentsState(object):
     def has_more_step(self) -> bool:
         return self.current_step < len(self.plan)
 
+    def step_dependencies(self, step: int) -> list[int]:
+        if step < len(self.plan_dependencies):
+            return [dependency for dependency in self.plan_dependencies[step] if 0 <= dependency < step]
+
+        return list(range(step))
+
+    def ready_steps(self, running: set[int] = frozenset()) -> list[int]:
+        """Steps that aren't done or running yet and whose dependencies are all completed, in plan order."""
+        completed = set(self.completed_steps)
+        return [
+            step
+            for step in range(len(self.plan))
+            if step not in completed
+            and step not in running
+            and all(dependency in completed for dependency in self.step_dependencies(step))
+        ]
+
+    def set_plan(self, plan: list[tuple[str, str]], dependencies: list[list[int]]) -> None:
+        self.plan = plan
+        self.plan_dependencies = dependencies
+        self.completed_steps = []
+        self.current_step = 0
+
+    def clear_plan(self) -> None:
+        """Removes the steps before a new plan is made, current_step is kept until the new plan is set."""
+        self.plan = []
+        self.plan_dependencies = []
+        self.completed_steps = []
+
     def modify_current_step(self, modified_instruction: str) -> str:
         step = self.plan[self.current_step]
         speaker_of_step = step[0]
@@ -51,30 +378,14 @@ class AgentsState(object):
         return self.plan[self.current_step]
 
     def get_state_string(self) -> str:
-        return f"""{{
-                user_id: {self.user_id},
-                plan: {self.plan},
-                research_results: {self.research_results},
-                queried_data (first 2 rows of each DataFrame): {'  -----------   '.join([f"Query {i}: {self.queried_data[data].to_json()}" for i, data in enumerate(self.queried_data)])},
-                chat_history: {self.chat_history},
-                current_step: {self.current_step},
-                calculation_result: {self.calculation_results}
-            }}"""  # noqa: E501
+        """Compact rendering of the state for agent prompts, reused until the state changes."""
+        if self._rendered is None or self._rendered[0] != self.version:
+            object.__setattr__(self, "_rendered", (self.version, state_renderer.render(self)))
 
-    def get_json(self) -> str:
-        queried_data_json = dict([(var, df.to_dict()) for var, df in self.queried_data.items()])
-        json_output = {
-            "client_id": self.user_id,
-            "base_utterance": self.base_utterance,
-            "plan": self.plan,
-            "research_results": self.research_results,
-            "queried_data": queried_data_json,
-            "chat_history": self.chat_history,
-            "current_step": self.current_step,
-            "calculation_results": self.calculation_results,
-        }
+        return self._rendered[1]
 
-        return json.dumps(json_output)
+    def get_json(self) -> str:
+        return "{" + ", ".join(f'"{key}": {self.json_fragment(field)}' for field, key in STATE_FIELDS.items()) + "}"
 
 
 def load_state_from_json(file: FilePath) -> AgentsState:
@@ -94,28 +405,6 @@ def load_state_from_json(file: FilePath) -> AgentsState:
     return state
 
 
-def get_logger(name: str, stream_output: TextIO, file_output_location: str = None) -> logging.Logger:
-    if name in logging.Logger.manager.loggerDict:
-        return logging.getLogger(name)
-    else:
-        logger = logging.getLogger(name)
-        formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
-
-        if file_output_location is not None:
-            file_handler = logging.FileHandler(Path(file_output_location))
-            file_handler.setFormatter(formatter)
-            file_handler.setLevel(logging.INFO)
-            logger.addHandler(file_handler)
-
-        console_handler = logging.StreamHandler(stream_output)
-        console_handler.setFormatter(formatter)
-        console_handler.setLevel(logging.INFO)
-        logger.addHandler(console_handler)
-
-        logger.info(f"New logger created for {name}")
-        return logger
-
-
 def eval_response(agent_response: str) -> tuple[str, str]:
     try:
         striped = agent_response.split(",", maxsplit=1)
@@ -0,0 +1,163 @@
+from typing import Callable, Literal, Optional, get_args
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+
+Aggregation = Literal["sum", "mean", "median", "min", "max", "std", "count"]
+GroupColumn = Literal["service_month", "site_name"]
+
+# Service months are stored like "APR-2022"
+MONTH_FORMAT = "%b-%Y"
+
+AGGREGATIONS: dict[str, Callable[[np.ndarray], float]] = {
+    "sum": np.sum,
+    "mean": np.mean,
+    "median": np.median,
+    "min": np.min,
+    "max": np.max,
+    "std": lambda values: np.std(values, ddof=1) if len(values) > 1 else 0.0,
+    "count": len,
+}
+
+
+class PrimitiveError(ValueError):
+    """The arguments of a calculation primitive don't fit the queried data."""
+
+
+def _check_choice(name: str, value: str, choices: tuple) -> None:
+    if value not in choices:
+        raise PrimitiveError(f"{name} must be one of {', '.join(choices)}, got '{value}'")
+
+
+def _column(df: DataFrame, column: str) -> pd.Series:
+    if not isinstance(df, DataFrame):
+        # pandas_engine stores whatever its query evaluates to, e.g. a Series or a single number
+        raise PrimitiveError(f"The queried data must be a DataFrame, got {type(df).__name__}")
+    if column not in df.columns:
+        raise PrimitiveError(f"Column '{column}' doesn't exist, the columns are: {', '.join(map(str, df.columns))}")
+
+    return df[column]
+
+
+def values_of(df: DataFrame, column: str) -> np.ndarray:
+    """Non-null values of a numeric column as a float array."""
+    series = _column(df, column)
+    if not pd.api.types.is_numeric_dtype(series):
+        raise PrimitiveError(f"Column '{column}' isn't numeric, its type is {series.dtype}")
+
+    values = series.to_numpy(dtype="float64", na_value=np.nan)
+    return values[~np.isnan(values)]
+
+
+def _not_empty(values: np.ndarray, column: str) -> np.ndarray:
+    if not len(values):
+        raise PrimitiveError(f"Column '{column}' has no values")
+
+    return values
+
+
+def months_of(df: DataFrame) -> pd.Series:
+    try:
+        return pd.to_datetime(_column(df, "service_month"), format=MONTH_FORMAT)
+    except ValueError as e:
+        raise PrimitiveError(f"service_month must be formatted like APR-2022: {str(e)}")
+
+
+def aggregate(df: DataFrame, aggregation: Aggregation, column: str = "value") -> float:
+    _check_choice("aggregation", aggregation, get_args(Aggregation))
+    values = values_of(df, column)
+    if aggregation != "count":
+        _not_empty(values, column)
+
+    return float(AGGREGATIONS[aggregation](values))
+
+
+def diff_of_means(df_a: DataFrame, df_b: DataFrame, column: str = "value") -> float:
+    mean_a = np.mean(_not_empty(values_of(df_a, column), column))
+    mean_b = np.mean(_not_empty(values_of(df_b, column), column))
+    return float(mean_a - mean_b)
+
+
+def _aggregate_groups(df: DataFrame, keys, aggregation: Aggregation, column: str) -> pd.Series:
+    """Aggregation of the column in every group, groups without values are left out (except for counting)."""
+    _check_choice("aggregation", aggregation, get_args(Aggregation))
+    values_of(df, column)
+    values = pd.Series(df[column].to_numpy(dtype="float64", na_value=np.nan), index=df.index)
+    grouped = values.groupby(keys, observed=True, sort=True)
+    counts = grouped.count()
+    result = grouped.agg(aggregation)
+    if aggregation == "std":
+        # A single value has no spread, like the aggregate of a single value
+        result = result.fillna(0.0)
+
+    return result if aggregation == "count" else result[counts > 0]
+
+
+def monthly(df: DataFrame, aggregation: Aggregation = "sum", column: str = "value") -> pd.Series:
+    """Values aggregated by service month, in chronological order."""
+    return _aggregate_groups(df, months_of(df).to_numpy(), aggregation, column)
+
+
+def growth_rate(
+    df: DataFrame,
+    start_month: Optional[str] = None,
+    end_month: Optional[str] = None,
+    aggregation: Aggregation = "sum",
+    column: str = "value",
+) -> float:
+    """Relative change between two service months (the first and the last one by default), e.g. 0.1 for 10%."""
+    by_month = monthly(df, aggregation, column)
+    if by_month.empty:
+        raise PrimitiveError("There are no service months to compare")
+
+    def month_value(month: Optional[str], default: int) -> float:
+        if month is None:
+            return float(by_month.iloc[default])
+        try:
+            return float(by_month.loc[pd.to_datetime(month, format=MONTH_FORMAT)])
+        except (KeyError, ValueError):
+            raise PrimitiveError(f"Service month '{month}' isn't in the data or isn't formatted like APR-2022")
+
+    start, end = month_value(start_month, 0), month_value(end_month, -1)
+    if start == 0:
+        raise PrimitiveError("The value of the start month is 0, the growth rate is undefined")
+
+    return (end - start) / abs(start)
+
+
+def regression(df: DataFrame, aggregation: Aggregation = "sum", column: str = "value") -> dict[str, float]:
+    """Least squares line of the monthly values, the slope is the change per month."""
+    by_month = monthly(df, aggregation, column)
+    if len(by_month) < 2:
+        raise PrimitiveError("A regression needs the values of at least two service months")
+
+    months = by_month.index
+    x = np.asarray((months.year - months[0].year) * 12 + months.month - months[0].month, dtype="float64")
+    y = by_month.to_numpy(dtype="float64")
+    slope, intercept = np.polyfit(x, y, 1)
+
+    residual = np.sum((y - (slope * x + intercept)) ** 2)
+    total = np.sum((y - y.mean()) ** 2)
+    r_squared = 1.0 - residual / total if total else 1.0
+
+    return {"slope_per_month": float(slope), "intercept": float(intercept), "r_squared": float(r_squared)}
+
+
+def percentile(df: DataFrame, q: float, column: str = "value") -> float:
+    if not 0 <= q <= 100:
+        raise PrimitiveError(f"q must be between 0 and 100, got {q}")
+
+    return float(np.percentile(_not_empty(values_of(df, column), column), q))
+
+
+def group_by(
+    df: DataFrame, by: GroupColumn, aggregation: Aggregation = "sum", column: str = "value"
+) -> dict[str, float]:
+    _check_choice("by", by, get_args(GroupColumn))
+    if by == "service_month":
+        by_month = monthly(df, aggregation, column)
+        return {month.strftime(MONTH_FORMAT).upper(): float(value) for month, value in by_month.items()}
+
+    by_group = _aggregate_groups(df, _column(df, by), aggregation, column)
+    return {str(key): float(value) for key, value in by_group.items()}
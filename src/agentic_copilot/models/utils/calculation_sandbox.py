@@ -0,0 +1,196 @@
+import multiprocessing
+import queue
+import resource
+import signal
+import sys
+import threading
+from functools import cache
+from multiprocessing.connection import Connection
+from multiprocessing.shared_memory import SharedMemory
+from typing import Optional
+
+from agentic_copilot.config import settings
+from agentic_copilot.models.utils.agents_util import AgentsState, get_logger
+from agentic_copilot.models.utils.state_snapshot import decode_frame, encoded_frames
+
+logger = get_logger(__name__, stream_output=sys.stdout)
+
+RESULT = "result"
+ERROR = "error"
+
+
+class SandboxError(Exception):
+    """The calculation couldn't be finished in the sandbox (time or memory limit, or the worker died)."""
+
+
+class CPUTimeExceeded(Exception):
+    pass
+
+
+def _cpu_time_exceeded(signum, frame) -> None:
+    raise CPUTimeExceeded("The calculation exceeded its CPU time limit")
+
+
+def _limit_cpu_time(cpu_seconds: int) -> None:
+    # RLIMIT_CPU counts the CPU time of the whole process, the limit of a call starts from the time used so far
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    resource.setrlimit(resource.RLIMIT_CPU, (int(usage.ru_utime + usage.ru_stime) + cpu_seconds, hard))
+
+
+def _worker_main(conn: Connection, cpu_seconds: int, memory_bytes: int) -> None:
+    """Loop of a sandbox worker: runs one command at a time on the frames in the shared memory block it is given."""
+    resource.setrlimit(resource.RLIMIT_AS, (memory_bytes, memory_bytes))
+    signal.signal(signal.SIGXCPU, _cpu_time_exceeded)
+
+    while True:
+        try:
+            command, shm_name, frames = conn.recv()
+        except EOFError:
+            return
+
+        # The workers share the resource tracker of the pool, the block stays registered once until the pool unlinks it
+        shm = SharedMemory(name=shm_name)
+        namespace = {}
+        try:
+            _limit_cpu_time(cpu_seconds)
+            # The frames are read from the Arrow buffers in the shared block without copying the blobs
+            namespace = {
+                name: decode_frame(kind, shm.buf[offset : offset + length]) for name, kind, offset, length in frames
+            }
+            exec(command, namespace)
+            reply = (RESULT, namespace["result"])
+        except BaseException as e:
+            reply = (ERROR, f"{type(e).__name__}: {str(e)}")
+
+        try:
+            conn.send(reply)
+        except Exception:
+            # Results that can't be pickled are sent as their string representation
+            conn.send((RESULT, str(reply[1])))
+
+        namespace.clear()
+        try:
+            shm.close()
+        except BufferError:
+            # Something in the result still references the block, it is unmapped when that is collected
+            pass
+
+
+class _Worker:
+    def __init__(self, context, cpu_seconds: int, memory_bytes: int) -> None:
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn, cpu_seconds, memory_bytes), daemon=True)
+        self.process.start()
+        child_conn.close()
+
+    def kill(self) -> None:
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+
+class CalculationSandboxPool:
+    """Pool of worker processes that run the calculation commands written by the LLM outside of the server process.
+
+    The workers are forked from a server process that already imported pandas and pyarrow. The queried frames of a
+    call are put into a shared memory block in their Arrow IPC encoding (cached by the state), the workers read them
+    from there without copying. Every call is limited in CPU time and every worker in memory, a call that doesn't
+    finish within the timeout gets its worker killed and replaced. Only the result of the command is sent back.
+    """
+
+    def __init__(
+        self,
+        workers: int = settings.sandbox_workers,
+        cpu_seconds: int = settings.sandbox_cpu_seconds,
+        memory_bytes: int = settings.sandbox_memory_bytes,
+        timeout: float = settings.sandbox_timeout,
+    ) -> None:
+        self.cpu_seconds = cpu_seconds
+        self.memory_bytes = memory_bytes
+        self.timeout = timeout
+
+        self._context = multiprocessing.get_context("forkserver")
+        self._context.set_forkserver_preload([__name__])
+        self._lock = threading.Lock()
+        self._closed = False
+        self._workers: list[_Worker] = []
+        self._idle: queue.Queue[_Worker] = queue.Queue()
+        for _ in range(workers):
+            self._add_worker()
+
+    def _add_worker(self) -> None:
+        worker = _Worker(self._context, self.cpu_seconds, self.memory_bytes)
+        with self._lock:
+            self._workers.append(worker)
+        self._idle.put(worker)
+
+    def _replace_worker(self, worker: _Worker) -> None:
+        worker.kill()
+        with self._lock:
+            if self._closed:
+                return
+            self._workers.remove(worker)
+        self._add_worker()
+
+    def run(self, command: str, state: AgentsState) -> object:
+        """Runs the command with the queried frames of the state as variables and returns the value of 'result'.
+        Errors of the command and of the sandbox are raised as SandboxError."""
+        if self._closed:
+            raise SandboxError("The calculation sandbox was closed")
+
+        frames = encoded_frames(state)
+        size = sum(len(blob) for _, blob in frames.values())
+        shm = SharedMemory(create=True, size=max(size, 1))
+
+        try:
+            layout = []
+            offset = 0
+            for name, (kind, blob) in frames.items():
+                shm.buf[offset : offset + len(blob)] = blob
+                layout.append((name, kind, offset, len(blob)))
+                offset += len(blob)
+
+            try:
+                worker = self._idle.get(timeout=self.timeout)
+            except queue.Empty:
+                raise SandboxError(f"No calculation sandbox worker became free in {self.timeout} seconds")
+            if self._closed:
+                raise SandboxError("The calculation sandbox was closed")
+
+            try:
+                worker.conn.send((command, shm.name, layout))
+                if not worker.conn.poll(self.timeout):
+                    self._replace_worker(worker)
+                    raise SandboxError(f"The calculation didn't finish in {self.timeout} seconds")
+                status, value = worker.conn.recv()
+            except (EOFError, OSError):
+                # The worker was killed, most likely by the hard CPU limit or the kernel for its memory use
+                self._replace_worker(worker)
+                raise SandboxError("The calculation was terminated, it probably used too much memory or CPU time")
+            else:
+                self._idle.put(worker)
+        finally:
+            shm.close()
+            shm.unlink()
+
+        if status == ERROR:
+            raise SandboxError(value)
+        return value
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+            workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.kill()
+
+
+@cache
+def get_calculation_sandbox() -> Optional[CalculationSandboxPool]:
+    """Sandbox pool of the process, None when calculations are configured to run in process."""
+    if not settings.calculation_sandbox:
+        return None
+
+    logger.info(f"Starting {settings.sandbox_workers} calculation sandbox workers")
+    return CalculationSandboxPool()
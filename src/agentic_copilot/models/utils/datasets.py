@@ -0,0 +1,248 @@
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+
+DATASTREAMS_PATH = Path("data/datastreams_full_synth.csv")
+INVOICES_PATH = Path("data/synth_invoice_data_v2.csv")
+CSV_ENCODING = "ISO-8859-1"
+CACHE_DIR = Path("data/.cache")
+CACHE_FORMAT_VERSION = 2
+
+DATASTREAM_DTYPES = {
+    "client_id": "int64",
+    "data_stream": "category",
+    "site_name": "category",
+    "state": "string",
+    "country": "category",
+    "service_month": "string",
+    "type": "category",
+}
+
+# The datastream records are stored sorted by client, so that every client is a contiguous range of rows
+DATASTREAM_SORT_KEY = "client_id"
+
+INVOICE_DTYPES = {
+    "site_name": "category",
+    "state": "string",
+    "country": "category",
+    "service_month": "string",
+    "invoice_name": "string",
+    "submitted_by": "string",
+    "status": "category",
+}
+
+
+def _arrow_to_pandas_types() -> dict:
+    import pyarrow as pa
+
+    # Arrow strings are handed to pandas without copying, so they keep pointing into the memory-mapped cache file
+    return {
+        pa.string(): pd.StringDtype("pyarrow"),
+        pa.large_string(): pd.StringDtype("pyarrow"),
+    }
+
+
+def _cache_paths(csv_path: Path, cache_dir: Path) -> tuple[Path, Path]:
+    return cache_dir.joinpath(f"{csv_path.stem}.arrow"), cache_dir.joinpath(f"{csv_path.stem}.meta.json")
+
+
+def _file_digest(path: Path) -> str:
+    digest = hashlib.sha256()
+
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+
+def _source_metadata(
+    csv_path: Path, dtypes: dict[str, str], sort_by: Optional[str], digest: Optional[str] = None
+) -> dict:
+    stat = csv_path.stat()
+    return {
+        "version": CACHE_FORMAT_VERSION,
+        "dtypes": dtypes,
+        "sort_by": sort_by,
+        "mtime_ns": stat.st_mtime_ns,
+        "size": stat.st_size,
+        "sha256": digest if digest is not None else _file_digest(csv_path),
+    }
+
+
+def _write_json_atomic(path: Path, content: dict) -> None:
+    tmp_path = path.with_suffix(f"{path.suffix}.{os.getpid()}.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(content, f)
+    os.replace(tmp_path, path)
+
+
+def _cache_is_fresh(
+    csv_path: Path, cache_path: Path, meta_path: Path, dtypes: dict[str, str], sort_by: Optional[str]
+) -> bool:
+    if not cache_path.exists() or not meta_path.exists():
+        return False
+
+    with open(meta_path, "r") as f:
+        meta = json.load(f)
+
+    if meta.get("version") != CACHE_FORMAT_VERSION or meta.get("dtypes") != dtypes or meta.get("sort_by") != sort_by:
+        return False
+
+    stat = csv_path.stat()
+    if meta["mtime_ns"] == stat.st_mtime_ns and meta["size"] == stat.st_size:
+        return True
+
+    # The file was touched, it only has to be converted again if its content changed as well
+    digest = _file_digest(csv_path)
+    if digest != meta["sha256"]:
+        return False
+
+    _write_json_atomic(meta_path, _source_metadata(csv_path, dtypes, sort_by, digest=digest))
+    return True
+
+
+def build_columnar_cache(
+    csv_path: Path, dtypes: dict[str, str], sort_by: Optional[str] = None, cache_dir: Path = CACHE_DIR
+) -> Path:
+    """Converts a CSV dataset into a typed Arrow IPC file that can be memory-mapped on load. The rows are sorted
+    here, sorting the loaded frame would copy it out of the memory map."""
+    import pyarrow as pa
+
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    cache_path, meta_path = _cache_paths(csv_path, cache_dir)
+
+    df = pd.read_csv(csv_path, encoding=CSV_ENCODING).astype(dtypes)
+    if sort_by is not None:
+        df = df.sort_values(sort_by, kind="stable")
+    table = pa.Table.from_pandas(df, preserve_index=False)
+
+    tmp_path = cache_path.with_suffix(f".{os.getpid()}.tmp")
+    with pa.OSFile(str(tmp_path), "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, cache_path)
+
+    _write_json_atomic(meta_path, _source_metadata(csv_path, dtypes, sort_by))
+
+    return cache_path
+
+
+def load_columnar_dataset(
+    csv_path: Path, dtypes: dict[str, str], sort_by: Optional[str] = None, cache_dir: Path = CACHE_DIR
+) -> DataFrame:
+    """Loads a dataset from its memory-mapped columnar cache, (re)building the cache when the source CSV changed."""
+    import pyarrow as pa
+
+    cache_path, meta_path = _cache_paths(csv_path, cache_dir)
+
+    if not _cache_is_fresh(csv_path, cache_path, meta_path, dtypes, sort_by):
+        build_columnar_cache(csv_path, dtypes, sort_by=sort_by, cache_dir=cache_dir)
+
+    with pa.memory_map(str(cache_path), "r") as source:
+        table = pa.ipc.open_file(source).read_all()
+
+    return table.to_pandas(types_mapper=_arrow_to_pandas_types().get)
+
+
+def without_unused_categories(df: DataFrame) -> DataFrame:
+    """Frame with the same columns whose categoricals only keep the categories that occur in it. Only the category
+    codes are rebuilt, the other columns are shared with the original frame."""
+    return DataFrame(
+        {
+            column: values.cat.remove_unused_categories() if isinstance(values.dtype, pd.CategoricalDtype) else values
+            for column, values in df.items()
+        },
+        copy=False,
+    )
+
+
+class DatasetRegistry:
+    """Process-wide store of the datasets used by the query agents.
+
+    Every dataset is loaded once on first access from its memory-mapped columnar cache. The datastream records are
+    sorted by client so that the per-client frames handed out to the agents are positional slices (views) of the
+    shared frame and not copies, copy-on-write (see configure_pandas) keeps a view that is modified from changing the
+    shared frame. The categorical columns of a client's frame are recoded to the client's own values,
+    so nothing computed on it lists the sites or streams of other clients.
+    """
+
+    def __init__(
+        self,
+        datastreams_path: Path = DATASTREAMS_PATH,
+        invoices_path: Path = INVOICES_PATH,
+        cache_dir: Path = CACHE_DIR,
+    ) -> None:
+        self.datastreams_path = datastreams_path
+        self.invoices_path = invoices_path
+        self.cache_dir = cache_dir
+        self._lock = threading.RLock()
+        self._datastreams: Optional[DataFrame] = None
+        self._invoices: Optional[DataFrame] = None
+        self._client_bounds: dict[int, tuple[int, int]] = {}
+        self._client_views: dict[int, DataFrame] = {}
+
+    def _load_datastreams(self) -> DataFrame:
+        return load_columnar_dataset(
+            self.datastreams_path, DATASTREAM_DTYPES, sort_by=DATASTREAM_SORT_KEY, cache_dir=self.cache_dir
+        )
+
+    def _load_invoices(self) -> DataFrame:
+        return load_columnar_dataset(self.invoices_path, INVOICE_DTYPES, cache_dir=self.cache_dir)
+
+    @property
+    def datastreams(self) -> DataFrame:
+        if self._datastreams is None:
+            with self._lock:
+                if self._datastreams is None:
+                    datastreams = self._load_datastreams()
+                    client_ids = datastreams["client_id"].to_numpy()
+                    unique_ids = np.unique(client_ids)
+                    starts = np.searchsorted(client_ids, unique_ids, side="left")
+                    stops = np.searchsorted(client_ids, unique_ids, side="right")
+                    self._client_bounds = {
+                        int(client_id): (int(start), int(stop))
+                        for client_id, start, stop in zip(unique_ids, starts, stops)
+                    }
+                    self._datastreams = datastreams
+
+        return self._datastreams
+
+    @property
+    def invoices(self) -> DataFrame:
+        if self._invoices is None:
+            with self._lock:
+                if self._invoices is None:
+                    self._invoices = self._load_invoices()
+
+        return self._invoices
+
+    def client_datastreams(self, client_id: int | str) -> DataFrame:
+        """Datastream records of one client as a view of the shared frame."""
+        client_id = int(client_id)
+        datastreams = self.datastreams
+
+        with self._lock:
+            view = self._client_views.get(client_id)
+            if view is None:
+                start, stop = self._client_bounds.get(client_id, (0, 0))
+                view = without_unused_categories(datastreams.iloc[start:stop])
+                self._client_views[client_id] = view
+
+        return view
+
+
+dataset_registry = DatasetRegistry()
+
+
+if __name__ == "__main__":
+    # Conversion step, run from the src directory to build the caches ahead of the first start
+    build_columnar_cache(DATASTREAMS_PATH, DATASTREAM_DTYPES, sort_by=DATASTREAM_SORT_KEY)
+    build_columnar_cache(INVOICES_PATH, INVOICE_DTYPES)
@@ -0,0 +1,241 @@
+import asyncio
+import hashlib
+import sqlite3
+import threading
+import time
+from functools import cache
+from pathlib import Path
+from typing import Any, Optional
+
+import numpy as np
+from llama_index.core.base.embeddings.base import BaseEmbedding, Embedding
+from pydantic import PrivateAttr
+
+from agentic_copilot.config import settings
+
+CACHE_DIR = Path("data/.cache/embeddings")
+KEY_SIZE = 16
+
+
+class EmbeddingCache:
+    """Persistent embedding store keyed by the hash of the embedded text.
+
+    The vectors live in a memory-mapped float32 matrix with one row per slot, the key -> slot mapping and the last
+    usage of every slot are kept in SQLite. When every slot is taken the least recently used entries are evicted and
+    their slots are reused. Every slot also stores the key it was written for, so a row overwritten by another process
+    in the meantime is detected as a miss instead of returning a wrong vector.
+
+    The width of the rows is taken from the first vector that is stored and kept in SQLite, vectors of another width
+    aren't cached.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        max_entries: int = settings.embedding_cache_size,
+        cache_dir: Path = CACHE_DIR,
+    ) -> None:
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.directory = cache_dir.joinpath(namespace)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+        self.dimensions: Optional[int] = None
+        self._vectors: Optional[np.memmap] = None
+        self._keys = self._open_memmap("keys.bin", np.uint8, (max_entries, KEY_SIZE))
+
+        self._db = sqlite3.connect(
+            self.directory.joinpath("index.sqlite"), check_same_thread=False, timeout=30, isolation_level=None
+        )
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries (key BLOB PRIMARY KEY, slot INTEGER UNIQUE, last_used REAL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS metadata (name TEXT PRIMARY KEY, value INTEGER)")
+
+        row = self._db.execute("SELECT value FROM metadata WHERE name = 'dimensions'").fetchone()
+        if row is not None:
+            self._open_vectors(row[0])
+
+    def _set_dimensions(self, dimensions: int) -> None:
+        row = self._db.execute("SELECT value FROM metadata WHERE name = 'dimensions'").fetchone()
+        if row is not None:
+            # Another process stored the first vectors in the meantime
+            dimensions = row[0]
+        else:
+            # Caches written before the width was recorded are started over, their rows may have another width
+            self._db.execute("DELETE FROM entries")
+            self.directory.joinpath("vectors.f32").unlink(missing_ok=True)
+            self._db.execute("INSERT INTO metadata (name, value) VALUES ('dimensions', ?)", (dimensions,))
+
+        self._open_vectors(dimensions)
+
+    def _open_vectors(self, dimensions: int) -> None:
+        self.dimensions = dimensions
+        self._vectors = self._open_memmap("vectors.f32", np.float32, (self.max_entries, dimensions))
+
+    def _open_memmap(self, file_name: str, dtype, shape: tuple[int, int]) -> np.memmap:
+        path = self.directory.joinpath(file_name)
+        if not path.exists():
+            # Sparse file, the disk is only used by the slots that are written
+            with open(path, "wb") as f:
+                f.truncate(int(np.prod(shape)) * np.dtype(dtype).itemsize)
+
+        return np.memmap(path, dtype=dtype, mode="r+", shape=shape)
+
+    def key(self, text: str) -> bytes:
+        return hashlib.blake2b(f"{self.namespace}\0{text}".encode("utf-8"), digest_size=KEY_SIZE).digest()
+
+    def get_many(self, texts: list[str]) -> list[Optional[list[float]]]:
+        keys = [self.key(text) for text in texts]
+        results: list[Optional[list[float]]] = [None] * len(texts)
+        if not keys:
+            return results
+
+        with self._lock:
+            if self._vectors is None:
+                # Nothing was stored yet
+                return results
+
+            placeholders = ",".join("?" * len(keys))
+            slots = dict(self._db.execute(f"SELECT key, slot FROM entries WHERE key IN ({placeholders})", keys))
+
+            hits = []
+            for i, key in enumerate(keys):
+                slot = slots.get(key)
+                if slot is not None and self._keys[slot].tobytes() == key:
+                    results[i] = self._vectors[slot].tolist()
+                    hits.append(key)
+
+            if hits:
+                now = time.time()
+                self._db.execute("BEGIN")
+                self._db.executemany("UPDATE entries SET last_used = ? WHERE key = ?", [(now, key) for key in hits])
+                self._db.execute("COMMIT")
+
+        return results
+
+    def put_many(self, texts: list[str], embeddings: list[Embedding]) -> None:
+        entries = {self.key(text): embedding for text, embedding in zip(texts, embeddings)}
+        if not entries:
+            return
+        now = time.time()
+
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                if self._vectors is None:
+                    self._set_dimensions(len(next(iter(entries.values()))))
+
+                entries = {key: embedding for key, embedding in entries.items() if len(embedding) == self.dimensions}
+                for key, embedding in entries.items():
+                    row = self._db.execute("SELECT slot FROM entries WHERE key = ?", (key,)).fetchone()
+                    if row is not None:
+                        slot = row[0]
+                        self._db.execute("UPDATE entries SET last_used = ? WHERE key = ?", (now, key))
+                    else:
+                        slot = self._allocate_slot()
+                        self._db.execute(
+                            "INSERT INTO entries (key, slot, last_used) VALUES (?, ?, ?)", (key, slot, now)
+                        )
+
+                    self._vectors[slot] = np.asarray(embedding, dtype=np.float32)
+                    self._keys[slot] = np.frombuffer(key, dtype=np.uint8)
+
+                self._vectors.flush()
+                self._keys.flush()
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def _allocate_slot(self) -> int:
+        (used,) = self._db.execute("SELECT COUNT(*) FROM entries").fetchone()
+        if used < self.max_entries:
+            return used
+
+        key, slot = self._db.execute("SELECT key, slot FROM entries ORDER BY last_used LIMIT 1").fetchone()
+        self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+
+        return slot
+
+
+@cache
+def get_embedding_cache(model: str, deployment: str) -> EmbeddingCache:
+    return EmbeddingCache(namespace=f"{model}__{deployment}")
+
+
+class CachedEmbedding(BaseEmbedding):
+    """Embedding model wrapper that serves previously embedded texts from the persistent embedding cache and only
+    sends the missing ones to the wrapped model."""
+
+    embedding_model: BaseEmbedding
+    _cache: EmbeddingCache = PrivateAttr()
+
+    def __init__(self, embedding_model: BaseEmbedding, embedding_cache: EmbeddingCache, **kwargs: Any) -> None:
+        super().__init__(
+            embedding_model=embedding_model,
+            model_name=embedding_model.model_name,
+            embed_batch_size=embedding_model.embed_batch_size,
+            **kwargs,
+        )
+        self._cache = embedding_cache
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "CachedEmbedding"
+
+    def _split_hits(self, texts: list[str]) -> tuple[list[Optional[Embedding]], list[int]]:
+        embeddings = self._cache.get_many(texts)
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+
+        return embeddings, missing
+
+    def _store(self, embeddings, missing, texts, new_embeddings) -> list[Embedding]:
+        for i, embedding in zip(missing, new_embeddings):
+            embeddings[i] = embedding
+        self._cache.put_many([texts[i] for i in missing], new_embeddings)
+
+        return embeddings
+
+    def _get_text_embeddings(self, texts: list[str]) -> list[Embedding]:
+        embeddings, missing = self._split_hits(texts)
+        if not missing:
+            return embeddings
+
+        new_embeddings = self.embedding_model.get_text_embedding_batch([texts[i] for i in missing])
+        return self._store(embeddings, missing, texts, new_embeddings)
+
+    async def _aget_text_embeddings(self, texts: list[str]) -> list[Embedding]:
+        # The cache reads and writes SQLite and the memory-mapped files, they run off the event loop
+        embeddings, missing = await asyncio.to_thread(self._split_hits, texts)
+        if not missing:
+            return embeddings
+
+        new_embeddings = await self.embedding_model.aget_text_embedding_batch([texts[i] for i in missing])
+        return await asyncio.to_thread(self._store, embeddings, missing, texts, new_embeddings)
+
+    def _get_text_embedding(self, text: str) -> Embedding:
+        return self._get_text_embeddings([text])[0]
+
+    async def _aget_text_embedding(self, text: str) -> Embedding:
+        return (await self._aget_text_embeddings([text]))[0]
+
+    # Query embeddings may be produced differently than text embeddings, so they are cached under their own keys
+    def _get_query_embedding(self, query: str) -> Embedding:
+        embedding = self._cache.get_many([f"query:{query}"])[0]
+        if embedding is None:
+            embedding = self.embedding_model.get_query_embedding(query)
+            self._cache.put_many([f"query:{query}"], [embedding])
+
+        return embedding
+
+    async def _aget_query_embedding(self, query: str) -> Embedding:
+        embedding = (await asyncio.to_thread(self._cache.get_many, [f"query:{query}"]))[0]
+        if embedding is None:
+            embedding = await self.embedding_model.aget_query_embedding(query)
+            await asyncio.to_thread(self._cache.put_many, [f"query:{query}"], [embedding])
+
+        return embedding
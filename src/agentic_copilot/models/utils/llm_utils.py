@@ -1,13 +1,26 @@
+import asyncio
 import json
+import os
+import sys
+import threading
+import time
+import weakref
 from enum import Enum
-from llama_index.embeddings.azure_openai import AzureOpenAIEmbedding
-from llama_index.llms.openai_like import OpenAILike
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional, TextIO
 
+import httpx
 import requests
 
 from agentic_copilot.config import settings
+from agentic_copilot.models.utils.logging_util import get_logger
+from agentic_copilot.models.utils.embedding_cache import CachedEmbedding, get_embedding_cache
+
+if TYPE_CHECKING:
+    from llama_index.llms.openai_like import OpenAILike
 
 litellm_proxy_base = "http://0.0.0.0:4000"
+PRICE_SNAPSHOT_PATH = Path("data/.cache/llm_prices.json")
 
 
 class LLMModels(str, Enum):
@@ -23,8 +36,9 @@ class LLMModels(str, Enum):
     GEMMA_2_9B = "gemma2-9b"
 
 
-def get_llm_prices() -> dict:
-    response = requests.get(f"{litellm_proxy_base}/v1/model/info")
+def get_llm_prices(timeout: Optional[float] = None) -> dict:
+    response = requests.get(f"{litellm_proxy_base}/v1/model/info", timeout=timeout)
+    response.raise_for_status()
     dict = json.loads(response.content.decode("utf-8"))
     return {
         model["model_name"]: {
@@ -35,22 +49,229 @@ def get_llm_prices() -> dict:
     }
 
 
-def llm_factory_function(model, temperature: float = 0.0) -> OpenAILike:
-    return OpenAILike(
-        model=model,
-        temperature=temperature,
-        api_base=litellm_proxy_base,
-        api_key="fake",
-        is_function_calling_model=True,
-        is_chat_model=True,
-    )
+class PriceRegistry:
+    """Lazily loaded table of the model prices served by the LiteLLM proxy.
+
+    Nothing is requested before the first lookup (or prefetch). The first lookup uses the on-disk snapshot of the last
+    successful fetch when there is one, otherwise the prices are fetched on a background thread and the lookups find no
+    prices until that finished, so no lookup waits for the proxy. Prices older than the TTL are refreshed on a
+    background thread as well, and a proxy that can't be reached leaves the last known prices in place. After
+    a failed request the proxy isn't asked again until the TTL passed.
+    """
+
+    def __init__(
+        self,
+        ttl: float = settings.llm_price_ttl,
+        snapshot_path: Path = PRICE_SNAPSHOT_PATH,
+        timeout: float = 2.0,
+        stream_output: TextIO = sys.stdout,
+    ) -> None:
+        self.ttl = ttl
+        self.snapshot_path = snapshot_path
+        self.timeout = timeout
+        self.logger = get_logger(__name__, stream_output=stream_output)
+        self._lock = threading.Lock()
+        self._prices: Optional[dict] = None
+        self._fetched_at = 0.0
+        self._failed_at: Optional[float] = None
+        self._refreshing = False
+
+    def _load_snapshot(self) -> bool:
+        try:
+            with open(self.snapshot_path, "r") as f:
+                self._prices = json.load(f)
+            self._fetched_at = os.path.getmtime(self.snapshot_path)
+            return True
+        except (OSError, ValueError):
+            return False
+
+    def _save_snapshot(self, prices: dict) -> None:
+        try:
+            self.snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.snapshot_path.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp_path, "w") as f:
+                json.dump(prices, f)
+            os.replace(tmp_path, self.snapshot_path)
+        except OSError as e:
+            self.logger.info(f"Couldn't save the price snapshot: {str(e)}")
+
+    def refresh(self) -> bool:
+        """Fetches the prices from the proxy, keeps the previous prices if that fails."""
+        try:
+            prices = get_llm_prices(timeout=self.timeout)
+        except Exception as e:
+            self.logger.info(f"Couldn't fetch the model prices from the proxy: {str(e)}")
+            self._failed_at = time.time()
+            return False
+
+        with self._lock:
+            self._prices = prices
+            self._fetched_at = time.time()
+            self._failed_at = None
+        self._save_snapshot(prices)
+
+        return True
+
+    def _backing_off(self) -> bool:
+        return self._failed_at is not None and time.time() - self._failed_at < self.ttl
+
+    def _refresh_in_background(self) -> None:
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def refresh() -> None:
+            try:
+                self.refresh()
+            finally:
+                self._refreshing = False
+
+        threading.Thread(target=refresh, name="llm-price-refresh", daemon=True).start()
+
+    def prefetch(self) -> None:
+        """Loads the snapshot or starts fetching the prices, so the first lookup finds them."""
+        self.prices
+
+    @property
+    def prices(self) -> dict:
+        if self._prices is None:
+            with self._lock:
+                loaded = self._prices is not None or self._load_snapshot()
+            if not loaded:
+                if not self._backing_off():
+                    self._refresh_in_background()
+                return {}
+
+        if time.time() - self._fetched_at > self.ttl and not self._backing_off():
+            self._refresh_in_background()
+
+        return self._prices
+
+    def get(self, model: str) -> Optional[dict]:
+        return self.prices.get(model)
+
+
+price_registry = PriceRegistry()
+
+
+class PerLoopTransport(httpx.AsyncBaseTransport):
+    """Async transport with a connection pool for every running event loop. Connections can't be used from another
+    loop than the one they were opened in, so a shared AsyncClient keeps the pools of the loops apart."""
+
+    def __init__(self, limits: httpx.Limits) -> None:
+        self._limits = limits
+        self._lock = threading.Lock()
+        # The pool of a loop is dropped with the loop
+        self._transports: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncHTTPTransport] = (
+            weakref.WeakKeyDictionary()
+        )
+
+    def _transport(self) -> httpx.AsyncHTTPTransport:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            transport = self._transports.get(loop)
+            if transport is None:
+                transport = httpx.AsyncHTTPTransport(limits=self._limits)
+                self._transports[loop] = transport
+
+        return transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        return await self._transport().handle_async_request(request)
+
+    async def aclose(self) -> None:
+        # Only the connections of the running loop can be closed here, the other pools are dropped
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            transport = self._transports.pop(loop, None)
+            self._transports = weakref.WeakKeyDictionary()
+
+        if transport is not None:
+            await transport.aclose()
+
+
+class LLMClientPool:
+    """Keeps one configured client per model and temperature, all of them sending their requests through the same
+    keep-alive HTTP connection pools to the LiteLLM proxy (one pool for sync requests and one per event loop)."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._clients: dict[tuple[str, float], "OpenAILike"] = {}
+        self._http_client: Optional[httpx.Client] = None
+        self._async_http_client: Optional[httpx.AsyncClient] = None
+
+    @staticmethod
+    def _limits() -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=settings.llm_max_connections,
+            max_keepalive_connections=settings.llm_max_keepalive_connections,
+            keepalive_expiry=settings.llm_keepalive_expiry,
+        )
+
+    def _create_client(self, model: str, temperature: float) -> "OpenAILike":
+        from llama_index.llms.openai_like import OpenAILike
+
+        if self._http_client is None:
+            self._http_client = httpx.Client(limits=self._limits(), timeout=settings.llm_timeout)
+            self._async_http_client = httpx.AsyncClient(
+                transport=PerLoopTransport(self._limits()), timeout=settings.llm_timeout
+            )
+
+        return OpenAILike(
+            model=model,
+            temperature=temperature,
+            api_base=litellm_proxy_base,
+            api_key="fake",
+            is_function_calling_model=True,
+            is_chat_model=True,
+            http_client=self._http_client,
+            async_http_client=self._async_http_client,
+        )
+
+    def get(self, model: str, temperature: float = 0.0) -> "OpenAILike":
+        key = (str(model), temperature)
+        client = self._clients.get(key)
+
+        if client is None:
+            with self._lock:
+                client = self._clients.get(key)
+                if client is None:
+                    client = self._create_client(model, temperature)
+                    self._clients[key] = client
+
+        # Agents set their own callback manager on the LLM they get, so every caller gets a shallow copy that still
+        # shares the underlying HTTP clients
+        return client.model_copy()
+
+    async def aclose(self) -> None:
+        with self._lock:
+            http_client, async_http_client = self._http_client, self._async_http_client
+            self._clients = {}
+            self._http_client = None
+            self._async_http_client = None
+
+        if http_client is not None:
+            http_client.close()
+        if async_http_client is not None:
+            await async_http_client.aclose()
+
+
+llm_client_pool = LLMClientPool()
+
+
+def llm_factory_function(model, temperature: float = 0.0) -> "OpenAILike":
+    return llm_client_pool.get(model=model, temperature=temperature)
 
 
 def embedding_factory_function(
     model: str = settings.embedding_model,
     embedding_deployment_name: str = settings.embedding_deployment,
+    use_cache: bool = True,
 ):
-    return AzureOpenAIEmbedding(
+    from llama_index.embeddings.azure_openai import AzureOpenAIEmbedding
+
+    embedding_model = AzureOpenAIEmbedding(
         model=model,
         azure_endpoint=settings.azure_endpoint,
         deployment_name=embedding_deployment_name,
@@ -59,5 +280,10 @@ def embedding_factory_function(
         api_version=settings.embedding_api_version,
     )
 
+    if not use_cache:
+        return embedding_model
+
+    return CachedEmbedding(
+        embedding_model=embedding_model, embedding_cache=get_embedding_cache(model, embedding_deployment_name)
+    )
 
-llm_prices = get_llm_prices()
@@ -0,0 +1,25 @@
+import logging
+from pathlib import Path
+from typing import TextIO
+
+
+def get_logger(name: str, stream_output: TextIO, file_output_location: str = None) -> logging.Logger:
+    if name in logging.Logger.manager.loggerDict:
+        return logging.getLogger(name)
+    else:
+        logger = logging.getLogger(name)
+        formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+        if file_output_location is not None:
+            file_handler = logging.FileHandler(Path(file_output_location))
+            file_handler.setFormatter(formatter)
+            file_handler.setLevel(logging.INFO)
+            logger.addHandler(file_handler)
+
+        console_handler = logging.StreamHandler(stream_output)
+        console_handler.setFormatter(formatter)
+        console_handler.setLevel(logging.INFO)
+        logger.addHandler(console_handler)
+
+        logger.info(f"New logger created for {name}")
+        return logger
@@ -0,0 +1,183 @@
+import json
+import os
+from pathlib import Path
+from typing import Any, Optional
+
+import numpy as np
+from llama_index.core.schema import BaseNode
+from llama_index.core.vector_stores import SimpleVectorStore
+from llama_index.core.vector_stores.types import (
+    BasePydanticVectorStore,
+    VectorStoreQuery,
+    VectorStoreQueryMode,
+    VectorStoreQueryResult,
+)
+from pydantic import PrivateAttr
+
+EMBEDDINGS_FILE = "embeddings.npy"
+NORMS_FILE = "embedding_norms.npy"
+METADATA_FILE = "vector_metadata.json"
+
+
+class NumpyVectorStore(BasePydanticVectorStore):
+    """Vector store that keeps every embedding in one float32 matrix.
+
+    The persisted matrix is a plain .npy file that is memory-mapped read-only on load, the norms of its rows are
+    persisted next to it so loading doesn't read the whole matrix. The node ids and their reference document ids are
+    kept in a small JSON sidecar. Texts stay in the docstore. A query is a single
+    matrix-vector product over the whole matrix.
+    """
+
+    stores_text: bool = False
+    is_embedding_query: bool = True
+
+    _ids: list[str] = PrivateAttr(default_factory=list)
+    _ref_doc_ids: list[Optional[str]] = PrivateAttr(default_factory=list)
+    _embeddings: np.ndarray = PrivateAttr()
+    _norms: np.ndarray = PrivateAttr()
+
+    def __init__(
+        self,
+        ids: Optional[list[str]] = None,
+        ref_doc_ids: Optional[list[Optional[str]]] = None,
+        embeddings: Optional[np.ndarray] = None,
+        norms: Optional[np.ndarray] = None,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(**kwargs)
+        self._ids = list(ids or [])
+        self._ref_doc_ids = list(ref_doc_ids or [None] * len(self._ids))
+        self._set_embeddings(embeddings if embeddings is not None else np.empty((0, 0), dtype=np.float32), norms)
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "NumpyVectorStore"
+
+    @property
+    def client(self) -> None:
+        return None
+
+    def _set_embeddings(self, embeddings: np.ndarray, norms: Optional[np.ndarray] = None) -> None:
+        """Sets the matrix, norms are the persisted norms of its rows (zero norms already replaced by 1)."""
+        self._embeddings = embeddings
+        if norms is None or len(norms) != len(embeddings):
+            norms = np.linalg.norm(embeddings, axis=1) if len(embeddings) else np.empty(0, dtype=np.float32)
+            norms = np.where(norms == 0, 1, norms)
+        self._norms = np.asarray(norms, dtype=np.float32)
+
+    @classmethod
+    def from_persist_dir(cls, persist_dir: Path) -> "NumpyVectorStore":
+        with open(Path(persist_dir).joinpath(METADATA_FILE), "r") as f:
+            metadata = json.load(f)
+
+        embeddings = np.load(Path(persist_dir).joinpath(EMBEDDINGS_FILE), mmap_mode="r")
+        # Stores persisted without the norms file compute the norms on load
+        norms_path = Path(persist_dir).joinpath(NORMS_FILE)
+        norms = np.load(norms_path) if norms_path.exists() else None
+
+        return cls(ids=metadata["ids"], ref_doc_ids=metadata["ref_doc_ids"], embeddings=embeddings, norms=norms)
+
+    @classmethod
+    def exists(cls, persist_dir: Path) -> bool:
+        persist_dir = Path(persist_dir)
+        return persist_dir.joinpath(EMBEDDINGS_FILE).exists() and persist_dir.joinpath(METADATA_FILE).exists()
+
+    @classmethod
+    def from_simple_vector_store(cls, simple_store: SimpleVectorStore) -> "NumpyVectorStore":
+        data = simple_store.data
+        ids = list(data.embedding_dict.keys())
+        embeddings = np.asarray([data.embedding_dict[node_id] for node_id in ids], dtype=np.float32)
+
+        return cls(
+            ids=ids,
+            ref_doc_ids=[data.text_id_to_ref_doc_id.get(node_id) for node_id in ids],
+            embeddings=embeddings.reshape(len(ids), -1),
+        )
+
+    def get_embeddings(self, node_ids: list[str]) -> Optional[np.ndarray]:
+        """Rows of the given nodes in their order, None if any of them isn't in the store."""
+        positions = {node_id: i for i, node_id in enumerate(self._ids)}
+        if any(node_id not in positions for node_id in node_ids):
+            return None
+
+        return np.asarray(self._embeddings[[positions[node_id] for node_id in node_ids]], dtype=np.float32)
+
+    def add(self, nodes: list[BaseNode], **add_kwargs: Any) -> list[str]:
+        if not nodes:
+            return []
+
+        new_embeddings = np.asarray([node.get_embedding() for node in nodes], dtype=np.float32)
+        if len(self._ids):
+            new_embeddings = np.vstack([self._embeddings, new_embeddings])
+
+        self._ids.extend(node.node_id for node in nodes)
+        self._ref_doc_ids.extend(node.ref_doc_id for node in nodes)
+        self._set_embeddings(new_embeddings)
+
+        return [node.node_id for node in nodes]
+
+    def delete(self, ref_doc_id: str, **delete_kwargs: Any) -> None:
+        keep = [i for i, doc_id in enumerate(self._ref_doc_ids) if doc_id != ref_doc_id]
+        if len(keep) == len(self._ids):
+            return
+
+        self._ids = [self._ids[i] for i in keep]
+        self._ref_doc_ids = [self._ref_doc_ids[i] for i in keep]
+        self._set_embeddings(np.ascontiguousarray(self._embeddings[keep]))
+
+    def query(self, query: VectorStoreQuery, **kwargs: Any) -> VectorStoreQueryResult:
+        if query.mode != VectorStoreQueryMode.DEFAULT:
+            raise ValueError(f"NumpyVectorStore only supports the default query mode, got: {query.mode}")
+        if query.filters is not None:
+            raise ValueError("NumpyVectorStore doesn't store metadata, filters aren't supported")
+        if not self._ids or query.query_embedding is None:
+            return VectorStoreQueryResult(similarities=[], ids=[])
+
+        query_embedding = np.asarray(query.query_embedding, dtype=np.float32)
+        similarities = (self._embeddings @ query_embedding) / (self._norms * np.linalg.norm(query_embedding))
+
+        candidates = np.arange(len(self._ids))
+        allowed_ids = set(query.node_ids or [])
+        allowed_doc_ids = set(query.doc_ids or [])
+        if allowed_ids or allowed_doc_ids:
+            candidates = np.asarray(
+                [
+                    i
+                    for i in candidates
+                    if (not allowed_ids or self._ids[i] in allowed_ids)
+                    and (not allowed_doc_ids or self._ref_doc_ids[i] in allowed_doc_ids)
+                ],
+                dtype=np.int64,
+            )
+            similarities = similarities[candidates]
+
+        top_k = min(query.similarity_top_k, len(candidates))
+        if top_k == 0:
+            return VectorStoreQueryResult(similarities=[], ids=[])
+
+        top = np.argpartition(-similarities, top_k - 1)[:top_k]
+        top = top[np.argsort(-similarities[top])]
+
+        return VectorStoreQueryResult(
+            similarities=[float(similarities[i]) for i in top], ids=[self._ids[candidates[i]] for i in top]
+        )
+
+    def persist(self, persist_path: str, fs: Optional[Any] = None) -> None:
+        # The storage context passes the path of the default JSON store, the files are written next to it
+        persist_dir = Path(persist_path).parent
+        persist_dir.mkdir(parents=True, exist_ok=True)
+
+        tmp_embeddings = persist_dir.joinpath(f"{EMBEDDINGS_FILE}.{os.getpid()}.tmp")
+        with open(tmp_embeddings, "wb") as f:
+            np.save(f, np.ascontiguousarray(self._embeddings, dtype=np.float32))
+        os.replace(tmp_embeddings, persist_dir.joinpath(EMBEDDINGS_FILE))
+
+        tmp_norms = persist_dir.joinpath(f"{NORMS_FILE}.{os.getpid()}.tmp")
+        with open(tmp_norms, "wb") as f:
+            np.save(f, self._norms)
+        os.replace(tmp_norms, persist_dir.joinpath(NORMS_FILE))
+
+        tmp_metadata = persist_dir.joinpath(f"{METADATA_FILE}.{os.getpid()}.tmp")
+        with open(tmp_metadata, "w") as f:
+            json.dump({"ids": self._ids, "ref_doc_ids": self._ref_doc_ids}, f)
+        os.replace(tmp_metadata, persist_dir.joinpath(METADATA_FILE))
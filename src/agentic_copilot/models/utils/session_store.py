@@ -0,0 +1,236 @@
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from functools import cache
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+from agentic_copilot.config import settings
+from agentic_copilot.models.utils.agents_util import AgentsState
+from agentic_copilot.models.utils.state_snapshot import dump_state, load_state
+
+
+class SessionConflictError(Exception):
+    """The session was saved by someone else since it was read."""
+
+
+class StoredSession(NamedTuple):
+    state: AgentsState
+    version: int
+
+
+class SessionStore(ABC):
+    """Stores the state of the conversations by session and user.
+
+    Every save increments the version of the session. A save is only accepted when the caller passes the version it
+    read (None for a new session), otherwise SessionConflictError is raised and the caller has to read the session
+    again. Sessions that weren't saved for the TTL are expired.
+    """
+
+    @abstractmethod
+    def get(self, session_id: str, user_id: str) -> Optional[StoredSession]:
+        pass
+
+    @abstractmethod
+    def put(self, session_id: str, user_id: str, state: AgentsState, expected_version: Optional[int]) -> int:
+        pass
+
+    @abstractmethod
+    def delete(self, session_id: str, user_id: str) -> None:
+        pass
+
+    @abstractmethod
+    def purge_expired(self) -> int:
+        pass
+
+
+class SqliteSessionStore(SessionStore):
+    """Durable session store, the states are kept as binary snapshots in a local SQLite database that can be shared
+    by the workers of the same host."""
+
+    def __init__(self, path: Path = Path(settings.session_db_path), ttl: float = settings.session_ttl) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self._lock = threading.Lock()
+
+        self._db = sqlite3.connect(self.path, check_same_thread=False, timeout=30, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS sessions (
+                session_id TEXT,
+                user_id TEXT,
+                version INTEGER,
+                expires_at REAL,
+                snapshot BLOB,
+                PRIMARY KEY (session_id, user_id)
+            )"""
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS sessions_expires_at ON sessions (expires_at)")
+
+    def version(self, session_id: str, user_id: str) -> Optional[int]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT version FROM sessions WHERE session_id = ? AND user_id = ? AND expires_at > ?",
+                (session_id, str(user_id), time.time()),
+            ).fetchone()
+
+        return row[0] if row is not None else None
+
+    def get_snapshot(self, session_id: str, user_id: str) -> Optional[tuple[bytes, int]]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT snapshot, version FROM sessions WHERE session_id = ? AND user_id = ? AND expires_at > ?",
+                (session_id, str(user_id), time.time()),
+            ).fetchone()
+
+        return (row[0], row[1]) if row is not None else None
+
+    def get(self, session_id: str, user_id: str) -> Optional[StoredSession]:
+        stored = self.get_snapshot(session_id, user_id)
+        if stored is None:
+            return None
+
+        return StoredSession(load_state(stored[0]), stored[1])
+
+    def put_snapshot(self, session_id: str, user_id: str, snapshot: bytes, expected_version: Optional[int]) -> int:
+        now = time.time()
+
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._db.execute(
+                    "SELECT version, expires_at FROM sessions WHERE session_id = ? AND user_id = ?",
+                    (session_id, str(user_id)),
+                ).fetchone()
+                # An expired session counts as missing, its version is continued so stale writers still conflict
+                current = row[0] if row is not None and row[1] > now else None
+                if current != expected_version:
+                    raise SessionConflictError(
+                        f"Session {session_id} is at version {current}, expected version {expected_version}"
+                    )
+
+                version = (row[0] if row is not None else 0) + 1
+                self._db.execute(
+                    "INSERT OR REPLACE INTO sessions (session_id, user_id, version, expires_at, snapshot) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (session_id, str(user_id), version, now + self.ttl, snapshot),
+                )
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+
+        return version
+
+    def put(self, session_id: str, user_id: str, state: AgentsState, expected_version: Optional[int]) -> int:
+        return self.put_snapshot(session_id, user_id, dump_state(state), expected_version)
+
+    def delete(self, session_id: str, user_id: str) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM sessions WHERE session_id = ? AND user_id = ?", (session_id, str(user_id)))
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            return self._db.execute("DELETE FROM sessions WHERE expires_at <= ?", (time.time(),)).rowcount
+
+
+class _MemoryEntry(NamedTuple):
+    state: AgentsState
+    version: int
+    size: int
+    expires_at: float
+
+
+class TieredSessionStore(SessionStore):
+    """Keeps the recently used sessions in memory in front of the durable SQLite store.
+
+    Every save is written through to SQLite, so evicting a session from memory only drops the in-memory copy. The
+    memory tier is bounded by the total size of the snapshots it holds, the least recently used sessions are evicted
+    first. Reads check the version in SQLite, a session saved by another worker is read from there. The states handed
+    out are copies (sharing their frames), so concurrent requests of the same session don't see each other's changes.
+    """
+
+    def __init__(
+        self,
+        durable: SqliteSessionStore,
+        max_memory_bytes: int = settings.session_memory_bytes,
+    ) -> None:
+        self.durable = durable
+        self.max_memory_bytes = max_memory_bytes
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[tuple[str, str], _MemoryEntry] = OrderedDict()
+        self._memory_bytes = 0
+
+    def _drop(self, key: tuple[str, str]) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._memory_bytes -= entry.size
+
+    def _remember(self, key: tuple[str, str], entry: _MemoryEntry) -> None:
+        with self._lock:
+            self._drop(key)
+            if entry.size > self.max_memory_bytes:
+                return
+
+            self._entries[key] = entry
+            self._memory_bytes += entry.size
+            while self._memory_bytes > self.max_memory_bytes:
+                self._drop(next(iter(self._entries)))
+
+    def get(self, session_id: str, user_id: str) -> Optional[StoredSession]:
+        key = (session_id, str(user_id))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+
+        if entry is not None and entry.expires_at > time.time():
+            if self.durable.version(session_id, user_id) == entry.version:
+                return StoredSession(entry.state.snapshot(), entry.version)
+
+        stored = self.durable.get_snapshot(session_id, user_id)
+        if stored is None:
+            with self._lock:
+                self._drop(key)
+            return None
+
+        # The size of the snapshot stands in for the memory of the state, its frames are only decoded when read
+        snapshot, version = stored
+        state = load_state(snapshot)
+        self._remember(key, _MemoryEntry(state, version, len(snapshot), time.time() + self.durable.ttl))
+        return StoredSession(state.snapshot(), version)
+
+    def put(self, session_id: str, user_id: str, state: AgentsState, expected_version: Optional[int]) -> int:
+        key = (session_id, str(user_id))
+        snapshot = dump_state(state)
+
+        try:
+            version = self.durable.put_snapshot(session_id, user_id, snapshot, expected_version)
+        except SessionConflictError:
+            with self._lock:
+                self._drop(key)
+            raise
+
+        self._remember(key, _MemoryEntry(state.snapshot(), version, len(snapshot), time.time() + self.durable.ttl))
+        return version
+
+    def delete(self, session_id: str, user_id: str) -> None:
+        with self._lock:
+            self._drop((session_id, str(user_id)))
+        self.durable.delete(session_id, user_id)
+
+    def purge_expired(self) -> int:
+        now = time.time()
+        with self._lock:
+            for key in [key for key, entry in self._entries.items() if entry.expires_at <= now]:
+                self._drop(key)
+
+        return self.durable.purge_expired()
+
+
+@cache
+def get_session_store() -> SessionStore:
+    return TieredSessionStore(SqliteSessionStore())
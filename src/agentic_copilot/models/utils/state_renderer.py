@@ -0,0 +1,134 @@
+from typing import TYPE_CHECKING
+
+from pandas import DataFrame, Series
+
+from agentic_copilot.config import settings
+
+if TYPE_CHECKING:
+    from agentic_copilot.models.utils.agents_util import AgentsState
+
+# Rough size of a token for English text and JSON, good enough to keep prompts within a budget
+CHARS_PER_TOKEN = 4
+# Rows shown of every queried frame, from the most detailed rendering to the most compact one
+HEAD_ROWS = (5, 2, 0)
+# Share of the budget the queried data may use, the rest is left for the chat history
+DATA_BUDGET_SHARE = 0.6
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def describe_shape(name: str, value) -> str:
+    if isinstance(value, DataFrame):
+        return f"{name}: {len(value)} rows x {len(value.columns)} columns"
+    if isinstance(value, Series):
+        return f"{name}: Series of {len(value)} values ({value.dtype})"
+    return f"{name}: {value!r}"
+
+
+def describe_frame(name: str, df: DataFrame, head_rows: int, with_stats: bool = True) -> str:
+    """Schema, row count, first rows and summary statistics of a queried frame instead of its full content. Series
+    are described as single column frames, other queried values (scalars) by their representation."""
+    if isinstance(df, Series):
+        df = df.to_frame()
+    elif not isinstance(df, DataFrame):
+        return describe_shape(name, df)
+
+    lines = [f"{name}: {len(df)} rows x {len(df.columns)} columns"]
+    lines.append("  columns: " + ", ".join(f"{column} ({dtype})" for column, dtype in df.dtypes.items()))
+
+    if with_stats and len(df):
+        numeric = df.select_dtypes("number")
+        for column in numeric.columns:
+            values = numeric[column].dropna().astype("float64")
+            nulls = len(df) - len(values)
+            if not len(values):
+                lines.append(f"  {column}: every value is null")
+                continue
+            lines.append(
+                f"  {column}: min={values.min():.6g}, mean={values.mean():.6g}, max={values.max():.6g}, "
+                f"sum={values.sum():.6g}, nulls={nulls}"
+            )
+        for column in df.columns.difference(numeric.columns, sort=False):
+            values = df[column]
+            top = values.value_counts().head(3)
+            lines.append(
+                f"  {column}: {values.nunique()} distinct, top: " + ", ".join(f"{key} ({n})" for key, n in top.items())
+            )
+
+    if head_rows and len(df):
+        lines.append(f"  first {min(head_rows, len(df))} rows:")
+        lines.append(df.head(head_rows).to_csv(index=False).strip())
+
+    return "\n".join(lines)
+
+
+class StateRenderer:
+    """Renders the state of the conversation for agent prompts within a token budget.
+
+    Queried frames are summarized (schema, row count, head and statistics) and shown in less detail when they don't
+    fit their share of the budget, the chat history is filled in from the most recent message backwards. The last
+    rendering of a state and the summary of every frame are reused as long as they don't change.
+    """
+
+    def __init__(self, token_budget: int) -> None:
+        self.token_budget = token_budget
+
+    def _render_queried_data(self, state: "AgentsState", budget: int) -> str:
+        if not state.queried_data:
+            return "{}"
+
+        for head_rows in HEAD_ROWS:
+            for with_stats in (True, False) if head_rows == 0 else (True,):
+                rendered = "\n".join(
+                    state.frame_fragment(
+                        name,
+                        f"summary:{head_rows}:{with_stats}",
+                        lambda df: describe_frame(name, df, head_rows, with_stats),
+                    )
+                    for name in state.queried_data
+                )
+                if estimate_tokens(rendered) <= budget:
+                    return rendered
+
+        # Not even the schemas fit, only the shapes are listed
+        return "\n".join(describe_shape(name, value) for name, value in state.queried_data.items())
+
+    def _render_chat_history(self, chat_history: list[str], budget: int) -> str:
+        kept = []
+        used = 0
+        for message in reversed(chat_history):
+            tokens = estimate_tokens(str(message))
+            if used + tokens > budget:
+                break
+            kept.append(str(message))
+            used += tokens
+
+        omitted = len(chat_history) - len(kept)
+        prefix = [f"({omitted} earlier messages omitted)"] if omitted else []
+        return str(prefix + kept[::-1])
+
+    def render(self, state: "AgentsState") -> str:
+        scalars = f"""{{
+                user_id: {state.user_id},
+                plan: {state.plan},
+                plan_dependencies: {state.plan_dependencies},
+                completed_steps: {state.completed_steps},
+                research_results: {state.research_results},
+                current_step: {state.current_step},
+                calculation_result: {state.calculation_results},"""
+        remaining = max(0, self.token_budget - estimate_tokens(scalars))
+
+        queried_data = self._render_queried_data(state, int(remaining * DATA_BUDGET_SHARE))
+        remaining = max(0, remaining - estimate_tokens(queried_data))
+        chat_history = self._render_chat_history(state.chat_history, remaining)
+
+        return f"""{scalars}
+                queried_data (summary of each DataFrame):
+{queried_data}
+                chat_history: {chat_history}
+            }}"""
+
+
+state_renderer = StateRenderer(token_budget=settings.state_token_budget)
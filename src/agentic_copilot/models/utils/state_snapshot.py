@@ -0,0 +1,148 @@
+import json
+import os
+import pickle
+import struct
+import sys
+from pathlib import Path
+
+from pandas import DataFrame
+
+from agentic_copilot.models.utils.agents_util import (
+    STATE_FIELDS,
+    AgentsState,
+    LazyValue,
+    load_state_from_json,
+)
+
+# Layout: magic | header length (uint32, little-endian) | JSON header | frame blobs
+SNAPSHOT_MAGIC = b"ACSTATE1"
+HEADER_LENGTH = struct.Struct("<I")
+SNAPSHOT_SUFFIX = ".state"
+# Cache key of the encoded frames in the state
+FRAME_FRAGMENT_KIND = "snapshot"
+
+ARROW = "arrow"
+PICKLE = "pickle"
+
+
+def encode_frame(df: DataFrame) -> tuple[str, bytes]:
+    """Arrow IPC stream of the frame, the pandas metadata in the schema restores its dtypes and index. Frames Arrow
+    can't represent (mixed object columns) and queried values that aren't frames (Series, scalars) are pickled."""
+    if not isinstance(df, DataFrame):
+        return PICKLE, pickle.dumps(df, protocol=pickle.HIGHEST_PROTOCOL)
+
+    import pyarrow as pa
+
+    try:
+        table = pa.Table.from_pandas(df)
+    except (pa.ArrowException, TypeError, ValueError):
+        return PICKLE, pickle.dumps(df, protocol=pickle.HIGHEST_PROTOCOL)
+
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+
+    return ARROW, sink.getvalue().to_pybytes()
+
+
+def decode_frame(kind: str, blob: memoryview) -> DataFrame:
+    if kind == PICKLE:
+        return pickle.loads(blob)
+
+    import pyarrow as pa
+
+    return pa.ipc.open_stream(pa.py_buffer(blob)).read_all().to_pandas()
+
+
+def encoded_frames(state: AgentsState) -> dict[str, tuple[str, bytes]]:
+    """Encoding and blob of every queried frame. Frames that didn't change since they were loaded or last encoded
+    aren't encoded again."""
+    frames = {}
+    for name in state.queried_data:
+        placeholder = state.queried_data.raw_get(name)
+        if isinstance(placeholder, LazyValue):
+            # Never read since it was loaded, the original blob is used
+            frames[name] = placeholder.source
+        else:
+            frames[name] = state.frame_fragment(name, FRAME_FRAGMENT_KIND, encode_frame)
+
+    return frames
+
+
+def dump_state(state: AgentsState) -> bytes:
+    """Binary snapshot of the state: the fields other than queried_data as JSON, every frame as a separate blob."""
+    blobs = []
+    frames = []
+    offset = 0
+
+    for name, (kind, blob) in encoded_frames(state).items():
+        frames.append([name, kind, offset, len(blob)])
+        blobs.append(blob)
+        offset += len(blob)
+
+    # The JSON fragments of the fields are cached by the state until they change
+    fields = ", ".join(
+        f'"{key}": {state.json_fragment(field)}' for field, key in STATE_FIELDS.items() if field != "queried_data"
+    )
+    header = f'{{"fields": {{{fields}}}, "frames": {json.dumps(frames)}}}'.encode("utf-8")
+
+    return b"".join([SNAPSHOT_MAGIC, HEADER_LENGTH.pack(len(header)), header, *blobs])
+
+
+def _lazy_frame(kind: str, blob: memoryview) -> LazyValue:
+    # The state that reads the frame keeps the blob as its snapshot fragment, so it isn't encoded again
+    return LazyValue(lambda: decode_frame(kind, blob), source=(kind, blob), fragment_kind=FRAME_FRAGMENT_KIND)
+
+
+def load_state(data: bytes) -> AgentsState:
+    """Restores a state from a binary snapshot. The frames are only decoded when they are first read."""
+    data = memoryview(data)
+    if data[: len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+        raise ValueError("Not an agents state snapshot")
+
+    header_start = len(SNAPSHOT_MAGIC) + HEADER_LENGTH.size
+    (header_length,) = HEADER_LENGTH.unpack_from(data, len(SNAPSHOT_MAGIC))
+    header = json.loads(bytes(data[header_start : header_start + header_length]))
+    blobs = data[header_start + header_length :]
+
+    fields = header["fields"]
+    state = AgentsState(fields["client_id"])
+    for field, key in STATE_FIELDS.items():
+        if key in fields:
+            setattr(state, field, fields[key])
+
+    state.queried_data = {
+        name: _lazy_frame(kind, blobs[offset : offset + length])
+        for name, kind, offset, length in header["frames"]
+    }
+
+    return state
+
+
+def save_state_snapshot(state: AgentsState, path: Path) -> None:
+    path = Path(path)
+    tmp_path = path.with_suffix(f"{path.suffix}.{os.getpid()}.tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(dump_state(state))
+    os.replace(tmp_path, path)
+
+
+def load_state_snapshot(path: Path) -> AgentsState:
+    with open(path, "rb") as f:
+        return load_state(f.read())
+
+
+def load_state_file(path: Path) -> AgentsState:
+    """Loads a state saved either as a binary snapshot or in the JSON format."""
+    with open(path, "rb") as f:
+        is_snapshot = f.read(len(SNAPSHOT_MAGIC)) == SNAPSHOT_MAGIC
+
+    return load_state_snapshot(path) if is_snapshot else load_state_from_json(path)
+
+
+if __name__ == "__main__":
+    # Converts JSON state files (e.g. the expected states of the tests) to snapshots next to them
+    for json_path in map(Path, sys.argv[1:]):
+        snapshot_path = json_path.with_suffix(SNAPSHOT_SUFFIX)
+        save_state_snapshot(load_state_from_json(json_path), snapshot_path)
+        print(f"{json_path} ({json_path.stat().st_size} B) -> {snapshot_path} ({snapshot_path.stat().st_size} B)")
@@ -0,0 +1,169 @@
+import sys
+import threading
+from abc import ABC, abstractmethod
+from functools import cache
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional, TextIO
+
+import numpy as np
+
+from agentic_copilot.config import settings
+from agentic_copilot.models.utils.logging_util import get_logger
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+EMBEDDING_DIMENSIONS = settings.embedding_dimensions
+CLASSIFIERS = ["adversarial", "competition", "relevancy"]
+
+
+@cache
+def feature_names() -> "pd.Index":
+    """The classifiers were fitted on DataFrames with these column names."""
+    import pandas as pd
+
+    return pd.Index([f"KEY{i}" for i in range(0, EMBEDDING_DIMENSIONS)])
+
+
+class SentimentClassifier(ABC):
+    @abstractmethod
+    def predict_proba(self) -> "pd.DataFrame":
+        pass
+
+
+def classifier_path(classifier: str, model_dir: Path = Path("data")) -> Path:
+    return model_dir.joinpath(f"{classifier}_model.sav")
+
+
+class _ModelSnapshot:
+    """Loaded models together with their fused linear weights when every model is a binary logistic regression."""
+
+    def __init__(self, models: dict[str, SentimentClassifier], classifiers: list[str]) -> None:
+        self.models = models
+        self.weights: Optional[np.ndarray] = None
+        self.bias: Optional[np.ndarray] = None
+
+        if len(models) == len(classifiers) and all(_is_fusable(models[classifier]) for classifier in classifiers):
+            self.weights = np.ascontiguousarray(
+                np.concatenate([models[classifier].coef_ for classifier in classifiers]).T, dtype=np.float32
+            )
+            self.bias = np.concatenate([models[classifier].intercept_ for classifier in classifiers]).astype(np.float32)
+
+
+def _is_fusable(model) -> bool:
+    from sklearn.linear_model import LogisticRegression
+
+    # Binary one-vs-rest logistic regressions predict expit(X @ coef.T + intercept) for the positive class
+    return (
+        type(model) is LogisticRegression
+        and len(model.classes_) == 2
+        and getattr(model, "multi_class", "auto") in ("auto", "ovr", "deprecated", "warn")
+    )
+
+
+class ClassifierRegistry:
+    """Process-level registry of the utterance classifiers.
+
+    Every classifier is unpickled and validated once. The loaded models are kept in a dictionary that is never
+    mutated, only replaced, so predictions read a consistent snapshot while a model is hot-swapped.
+    """
+
+    def __init__(
+        self,
+        classifiers: list[str] = CLASSIFIERS,
+        model_dir: Path = Path("data"),
+        stream_output: TextIO = sys.stdout,
+    ) -> None:
+        self.classifiers = classifiers
+        self.model_dir = model_dir
+        self.logger = get_logger(__name__, stream_output=stream_output)
+        self._lock = threading.Lock()
+        self._snapshot = _ModelSnapshot({}, classifiers)
+
+    def _load_model(self, classifier: str, path: Optional[Path] = None) -> SentimentClassifier:
+        path = path if path is not None else classifier_path(classifier, self.model_dir)
+        self.logger.debug(f"Loading model: {classifier} from {path}")
+
+        import pickle
+
+        try:
+            with open(path, "rb") as f:
+                model = pickle.load(f)
+        except Exception as e:
+            self.logger.debug(f"Couldn't load classifier: {str(e)}")
+            raise e
+
+        self._validate(classifier, model)
+        return model
+
+    @staticmethod
+    def _validate(classifier: str, model) -> None:
+        if not callable(getattr(model, "predict_proba", None)):
+            raise ValueError(f"Classifier {classifier} has no predict_proba method")
+
+        n_features = getattr(model, "n_features_in_", EMBEDDING_DIMENSIONS)
+        if n_features != EMBEDDING_DIMENSIONS:
+            raise ValueError(f"Classifier {classifier} expects {n_features} features instead of {EMBEDDING_DIMENSIONS}")
+
+        classes = getattr(model, "classes_", None)
+        if classes is not None and len(classes) != 2:
+            raise ValueError(f"Classifier {classifier} is not a binary classifier, classes: {classes}")
+
+    def _current_snapshot(self) -> _ModelSnapshot:
+        snapshot = self._snapshot
+        if len(snapshot.models) == len(self.classifiers):
+            return snapshot
+
+        with self._lock:
+            missing = [classifier for classifier in self.classifiers if classifier not in self._snapshot.models]
+            if missing:
+                loaded = {classifier: self._load_model(classifier) for classifier in missing}
+                self._snapshot = _ModelSnapshot({**self._snapshot.models, **loaded}, self.classifiers)
+
+            return self._snapshot
+
+    @property
+    def models(self) -> dict[str, SentimentClassifier]:
+        return self._current_snapshot().models
+
+    def load_all(self) -> dict[str, SentimentClassifier]:
+        """Loads every classifier ahead of the first request."""
+        return self.models
+
+    def is_loaded(self) -> bool:
+        return len(self._snapshot.models) == len(self.classifiers)
+
+    def swap(self, classifier: str, path: Optional[Path] = None) -> None:
+        """Replaces a classifier with the model found at path (or its default location) without a restart.
+        The new model is loaded and validated before it becomes visible to predictions."""
+        if classifier not in self.classifiers:
+            raise ValueError(f"Unknown classifier: {classifier}")
+
+        model = self._load_model(classifier, path)
+
+        with self._lock:
+            self._snapshot = _ModelSnapshot({**self._snapshot.models, classifier: model}, self.classifiers)
+
+        self.logger.info(f"Classifier {classifier} has been swapped")
+
+    def predict_proba(self, embeddings: np.ndarray) -> np.ndarray:
+        """Probability of the positive class of every classifier for each embedding row.
+        Returns a float32 array of shape (len(embeddings), len(classifiers)) with columns in classifier order."""
+        snapshot = self._current_snapshot()
+
+        if snapshot.weights is not None:
+            logits = embeddings @ snapshot.weights + snapshot.bias
+            return 1 / (1 + np.exp(-logits))
+
+        import pandas as pd
+
+        # Wrapping the single float32 block with the precomputed names doesn't copy the embeddings
+        features = pd.DataFrame(embeddings, columns=feature_names(), copy=False)
+        scores = np.empty((len(embeddings), len(self.classifiers)), dtype=np.float32)
+        for i, classifier in enumerate(self.classifiers):
+            scores[:, i] = 1 - snapshot.models[classifier].predict_proba(features)[:, 0]
+
+        return scores
+
+
+classifier_registry = ClassifierRegistry()
@@ -1,29 +1,33 @@
+import asyncio
 import logging
-import pickle
+import re
 import sys
-from abc import ABC, abstractmethod
-from pathlib import Path
+from functools import cache
 from typing import TextIO
 
-import pandas as pd
+import numpy as np
 from llama_index.core import PromptTemplate
 
-from agentic_copilot.models.utils.agents_util import get_logger
+from agentic_copilot.models.utils.logging_util import get_logger
 from agentic_copilot.models.utils.llm_utils import LLMModels, llm_factory_function, embedding_factory_function
+from agentic_copilot.workflows.classifier_registry import (
+    CLASSIFIERS,
+    ClassifierRegistry,
+    classifier_registry,
+)
 
-
-class SentimentClassifier(ABC):
-    @abstractmethod
-    def predict_proba(self) -> pd.DataFrame:
-        pass
+ADVERSARIAL, COMPETITION, RELEVANCY = (CLASSIFIERS.index(name) for name in ["adversarial", "competition", "relevancy"])
+SENTENCE_BOUNDARY = re.compile(r"[.!?;]+\s+(?=\S)")
 
 
 class UtteranceChecker:
-    classifiers: list[str] = ["adversarial", "competition", "relevancy"]
+    classifiers: list[str] = CLASSIFIERS
 
     RELEVANCY_SCORE_THRESHOLD = 0.5
     ADVERSARIAL_SCORE_THRESHOLD = 0.5
     COMPETITION_SCORE_THRESHOL = 0.5
+    # Classifier scores closer than this to 0 or 1 are trusted without asking the LLM
+    CONFIDENT_SCORE_MARGIN = 0.1
 
     RELEVANCY_REFUSE_MESSAGE = "Sorry I can't answer that questions because the question pertain to the energy industry\
          or could it reasonably arise in a conversation with a chatbot designed for this sector"
@@ -87,70 +91,51 @@ class UtteranceChecker:
     """  # noqa: 501
     )
 
-    def __init__(self, stream_output: TextIO = sys.stdout):
+    def __init__(self, stream_output: TextIO = sys.stdout, registry: ClassifierRegistry = classifier_registry):
         self.logger: logging.Logger = get_logger(__name__, stream_output=stream_output)
         self.embedding_model = embedding_factory_function()
         self.llm = llm_factory_function(model=LLMModels.GPT_4O_MINI)
-        self.models = self._load_models()
-
-    def _load_models(self) -> list[SentimentClassifier]:
-        models = []
-
-        for classifier in self.classifiers:
-            self.logger.debug(f"Loading model: {classifier}")
-
-            try:
-                with open(Path(f"data/{classifier}_model.sav"), "rb") as f:
-                    models.append(pickle.load(f))
-
-            except Exception as e:
-                self.logger.debug(f"Couldn't load classifier: {str(e)}")
-                raise e
+        self.registry = registry
 
-        return models
-
-    async def _generate_embeddings(self, questions: str) -> pd.DataFrame:
+    async def _generate_embeddings(self, questions: list[str]) -> np.ndarray:
         embeddings = await self.embedding_model.aget_text_embedding_batch(texts=questions)
 
-        column_names = [f"KEY{i}" for i in range(0, 1536)]
-        embeddings_df = pd.DataFrame(embeddings, columns=column_names)
-
-        return embeddings_df
+        return np.ascontiguousarray(embeddings, dtype=np.float32)
 
-    async def _predict_proba(self, questions: list[str]) -> pd.DataFrame:
-        result = pd.DataFrame(questions, columns=["question"])
+    async def _predict_proba(self, questions: list[str]) -> np.ndarray:
         embeddings = await self._generate_embeddings(questions)
 
-        for i, model in enumerate(self.models):
-            column_name = f"{self.classifiers[i]}_score"
-            result[column_name] = [1 - prediction[0] for prediction in model.predict_proba(embeddings)]
-
-        return result
+        return self.registry.predict_proba(embeddings)
 
     async def _check_question_with_classifiers(self, questions) -> tuple[bool, str]:
-        classifiers_prediction = await self._predict_proba(questions=questions)
+        scores = await self._predict_proba(questions=questions)
 
-        irrelevant_questions = classifiers_prediction[
-            (classifiers_prediction["relevancy_score"] < self.RELEVANCY_SCORE_THRESHOLD)
-        ]
+        return self._classifier_decision(questions, scores)
+
+    def _classifier_decision(self, questions: list[str], scores: np.ndarray) -> tuple[bool, str]:
+        irrelevant_questions = np.flatnonzero(scores[:, RELEVANCY] < self.RELEVANCY_SCORE_THRESHOLD)
         if len(irrelevant_questions) > 0:
-            return False, f"{irrelevant_questions.loc[1,'question']} - {self.RELEVANCY_REFUSE_MESSAGE}"
+            return False, f"{questions[irrelevant_questions[0]]} - {self.RELEVANCY_REFUSE_MESSAGE}"
 
-        adversarial_questions = classifiers_prediction[
-            (classifiers_prediction["adversarial_score"] > self.ADVERSARIAL_SCORE_THRESHOLD)
-        ]
+        adversarial_questions = np.flatnonzero(scores[:, ADVERSARIAL] > self.ADVERSARIAL_SCORE_THRESHOLD)
         if len(adversarial_questions) > 0:
-            return False, f"{adversarial_questions.loc[1,'question']} {self.ADVERSIAL_REFUSE_MESSAGE}"
+            return False, f"{questions[adversarial_questions[0]]} {self.ADVERSIAL_REFUSE_MESSAGE}"
 
-        competition_questions = classifiers_prediction[
-            (classifiers_prediction["adversarial_score"] > self.COMPETITION_SCORE_THRESHOL)
-        ]
+        competition_questions = np.flatnonzero(scores[:, COMPETITION] > self.COMPETITION_SCORE_THRESHOL)
         if len(competition_questions) > 0:
-            return False, f"{competition_questions.loc[1,'question']} {self.COMPETITION_REFUSE_MESSAGE}"
+            return False, f"{questions[competition_questions[0]]} {self.COMPETITION_REFUSE_MESSAGE}"
 
         else:
             return True, "Questions didn't contain anything that we can't answer."
 
+    def _is_confident_accept(self, scores: np.ndarray) -> bool:
+        margin = self.CONFIDENT_SCORE_MARGIN
+        return bool(
+            (scores[:, RELEVANCY] >= 1 - margin).all()
+            and (scores[:, ADVERSARIAL] <= margin).all()
+            and (scores[:, COMPETITION] <= margin).all()
+        )
+
     async def _check_questions_with_llm(self, questions) -> tuple[bool, str]:
         check_prompt = self.check_prompt_template.format(questions=questions)
         check_response = str(await self.llm.acomplete(check_prompt))
@@ -162,9 +147,10 @@ class UtteranceChecker:
         else:
             return True, results[1]
 
-    async def check_utterance_async(self, question) -> tuple[bool, str]:
-        """Checks utterance if it has any irrelevant, adversial questions or questions that opt to
-        asking for comparative information about competing products, services, or companies."""
+    async def _divide_questions(self, question: str) -> list[str]:
+        # Single sentences are already short and clear questions, dividing them would cost an LLM round trip
+        if not SENTENCE_BOUNDARY.search(question.strip()):
+            return [question]
 
         # Divide question into shorter questions with the usage of a llm
         divide_prompt = f"""
@@ -173,14 +159,45 @@ class UtteranceChecker:
             {question}
         """
         divide_response = await self.llm.acomplete(divide_prompt)
-        questions = str(divide_response).split(";")
-        # print(questions)
+        return str(divide_response).split(";")
+
+    async def check_utterance_async(self, question, pipelined: bool = True) -> tuple[bool, str]:
+        """Checks utterance if it has any irrelevant, adversial questions or questions that opt to
+        asking for comparative information about competing products, services, or companies.
+
+        In pipelined mode the LLM judgement runs concurrently with the classifiers and is cancelled when the
+        classifiers deny the utterance or accept it with high confidence."""
+        if not pipelined:
+            questions = await self._divide_questions(question)
+
+            # First check question with classifiers
+            decision, reasoning = await self._check_question_with_classifiers(questions=questions)
+            if not decision:
+                return decision, reasoning
 
-        # First check question with classifiers
-        decision, reasoning = await self._check_question_with_classifiers(questions=questions)
-        if not decision:
+            # Then check question wih the llm
+            decision, reasoning = await self._check_questions_with_llm(questions=questions)
             return decision, reasoning
 
-        # Then check question wih the llm
-        decision, reasoning = await self._check_questions_with_llm(questions=questions)
-        return decision, reasoning
+        llm_check = asyncio.create_task(self._check_questions_with_llm(questions=[question]))
+        try:
+            questions = await self._divide_questions(question)
+            scores = await self._predict_proba(questions=questions)
+            decision, reasoning = self._classifier_decision(questions, scores)
+
+            if not decision or self._is_confident_accept(scores):
+                self.logger.debug(f"Classifiers decided without the LLM check: {decision}")
+                llm_check.cancel()
+                return decision, reasoning
+
+            return await llm_check
+
+        except BaseException:
+            llm_check.cancel()
+            raise
+
+
+@cache
+def get_utterance_checker() -> UtteranceChecker:
+    """The checker is stateless between calls, so one instance and its clients are shared by the whole process."""
+    return UtteranceChecker()
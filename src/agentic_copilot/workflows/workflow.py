@@ -13,7 +13,7 @@ from agentic_copilot.workflows.generate_response import (
     generate_request_input,
     generate_response,
 )
-from agentic_copilot.workflows.utterance_checker import UtteranceChecker
+from agentic_copilot.workflows.utterance_checker import get_utterance_checker
 
 
 class CopilotFlow(Workflow):
@@ -29,7 +29,7 @@ class CopilotFlow(Workflow):
             check = True
             reasoning = "The conversation was continued no check needed"
         else:
-            check, reasoning = await UtteranceChecker().check_utterance_async(utterance)
+            check, reasoning = await get_utterance_checker().check_utterance_async(utterance)
 
         if check:
             return CheckSuccesfulEvent(utterance=utterance, state=state, conversation_going=continue_bool)
@@ -0,0 +1,12 @@
+# Run from the src directory: gunicorn agentic_copilot.api.app:app
+import multiprocessing
+import os
+
+bind = f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', '8000')}"
+worker_class = "uvicorn.workers.UvicornWorker"
+# Every worker is async and serves many conversations at once, the sessions are shared through the session store
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+# The workflow itself may take minutes, the workers aren't restarted while they wait for the LLM
+timeout = int(os.getenv("WORKER_TIMEOUT", "360"))
+graceful_timeout = 30
+keepalive = 5
@@ -1,10 +1,14 @@
 import asyncio
 
+from agentic_copilot.config import configure_pandas, settings
+from agentic_copilot.models.agents.query.client_datastream_matching_engine import client_engine_cache
 from agentic_copilot.models.utils.agents_util import AgentsState
 from agentic_copilot.workflows.workflow import CopilotFlow
 
 
 async def main():
+    configure_pandas()
+    client_engine_cache.prewarm(settings.hot_client_ids)
     user_id = input("\033[34mHi, Cold you give me your user_id?\033[0m\t")
     state = AgentsState(user_id=user_id)
     utterance = input("\033[34mThanks, How can I help you?\033[0m\t")
@@ -0,0 +1,3 @@
+from agentic_copilot.config import configure_pandas
+
+configure_pandas()
@@ -19,9 +19,9 @@ from agentic_copilot.models.utils.agent_base import AgentBase, AgentFrameWork
 from agentic_copilot.models.utils.agents_util import (
     AgentsState,
     Speaker,
-    load_state_from_json,
 )
 from agentic_copilot.models.utils.llm_utils import LLMModels
+from agentic_copilot.models.utils.state_snapshot import load_state_file
 from tests.testing_utils import check_calculations, check_plan, check_queried_datas, check_researches, check_response
 
 TEST_CASE_RUNS = 10
@@ -108,7 +108,7 @@ async def arun_single_test(
     expected_output_state_path: str,
     agent_framework: AgentFrameWork,
 ):
-    state = load_state_from_json(Path(input_state_path))
+    state = load_state_file(Path(input_state_path))
     agent: AgentBase = agents[agent_speaker](
         state=state, model=LLMModels(model), agent_framework=agent_framework, cli_print=False
     )
@@ -118,7 +118,7 @@ async def arun_single_test(
     try:
         response = await agent.achat(question)
         end_time = time.perf_counter()
-        expected_state = load_state_from_json(Path(expected_output_state_path))
+        expected_state = load_state_file(Path(expected_output_state_path))
         result = await aevaluate_test_result(
             agent_speaker=agent_speaker,
             response=response,
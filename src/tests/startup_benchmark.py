@@ -0,0 +1,59 @@
+import argparse
+import re
+import subprocess
+import sys
+
+# Modules a worker imports before it can serve the first request
+STARTUP_MODULES = ["agentic_copilot.workflows.workflow"]
+IMPORT_TIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$")
+
+
+def measure_import_time(module: str) -> list[tuple[str, int, int, int]]:
+    """Imports the module in a fresh interpreter with -X importtime.
+    Returns (module, self_us, cumulative_us, depth) for every imported module in import order."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"], capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr}")
+
+    timings = []
+    for line in result.stderr.splitlines():
+        match = IMPORT_TIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            timings.append((name, int(self_us), int(cumulative_us), len(indent) // 2))
+
+    return timings
+
+
+def report(module: str, top: int) -> float:
+    timings = measure_import_time(module)
+    total_us = next((cumulative for name, _, cumulative, _ in reversed(timings) if name == module), 0)
+
+    print(f"{module}: {total_us / 1e6:.3f}s total, {len(timings)} modules imported")
+    print(f"{'cumulative (ms)':>16} {'self (ms)':>10}  module")
+    # Top level packages show where the time goes, the deeper levels are listed once their parent is slow
+    for name, self_us, cumulative_us, depth in sorted(timings, key=lambda timing: -timing[2])[:top]:
+        print(f"{cumulative_us / 1e3:>16.1f} {self_us / 1e3:>10.1f}  {'  ' * depth}{name}")
+
+    return total_us / 1e6
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import-time breakdown of the worker startup, run from src")
+    parser.add_argument("modules", nargs="*", default=STARTUP_MODULES)
+    parser.add_argument("--top", type=int, default=25, help="Number of slowest modules to list")
+    parser.add_argument("--budget", type=float, default=None, help="Fail when a module takes longer (seconds)")
+    args = parser.parse_args()
+
+    over_budget = []
+    for module in args.modules:
+        seconds = report(module, args.top)
+        if args.budget is not None and seconds > args.budget:
+            over_budget.append(module)
+        print()
+
+    if over_budget:
+        print(f"Import time budget of {args.budget}s exceeded by: {', '.join(over_budget)}")
+        sys.exit(1)
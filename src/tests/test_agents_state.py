@@ -0,0 +1,86 @@
+import json
+
+import pandas as pd
+
+from agentic_copilot.models.utils.agents_util import AgentsState, LazyValue, TrackedDict
+
+
+def make_state() -> AgentsState:
+    state = AgentsState(user_id=1)
+    state.set_plan([("query_orchestrator_agent", "query"), ("calculation_agent", "sum")], [[], [0]])
+    return state
+
+
+def test_in_place_changes_bump_the_version():
+    state = make_state()
+    version = state.version
+    field_version = state.field_version("chat_history")
+
+    state.chat_history.append("message")
+
+    assert state.version > version
+    assert state.field_version("chat_history") == field_version + 1
+
+
+def test_nested_list_mutation_invalidates_the_fragment():
+    state = make_state()
+    assert json.loads(state.json_fragment("plan_dependencies")) == [[], [0]]
+
+    state.plan_dependencies[0].append(1)
+    assert json.loads(state.json_fragment("plan_dependencies")) == [[1], [0]]
+
+    # Lists added after the assignment are tracked as well
+    state.plan_dependencies.append([])
+    state.plan_dependencies[2].extend([0, 1])
+    assert json.loads(state.json_fragment("plan_dependencies")) == [[1], [0], [0, 1]]
+
+
+def test_rendered_state_follows_nested_mutation():
+    state = make_state()
+    rendered = state.get_state_string()
+
+    state.plan_dependencies[1].append(5)
+    assert state.get_state_string() != rendered
+
+
+def test_json_fragment_is_cached_until_changed():
+    state = make_state()
+    fragment = state.json_fragment("plan")
+    assert state.json_fragment("plan") is fragment
+
+    state.plan[1] = ("calculation_agent", "mean")
+    assert state.json_fragment("plan") is not fragment
+
+
+def test_fragments_of_removed_frames_are_dropped():
+    state = make_state()
+    state.queried_data["a"] = pd.DataFrame({"value": [1.0]})
+    state.queried_data["b"] = pd.DataFrame({"value": [2.0]})
+    state.json_fragment("queried_data")
+    assert {name for name, _ in state._frame_fragments} == {"a", "b"}
+
+    del state.queried_data["a"]
+    assert {name for name, _ in state._frame_fragments} == {"b"}
+
+    state.queried_data["b"] = pd.DataFrame({"value": [3.0]})
+    assert state._frame_fragments == {}
+    assert json.loads(state.json_fragment("queried_data")) == {"b": {"value": {"0": 3.0}}}
+
+
+def test_snapshot_is_independent():
+    state = make_state()
+    copy = state.snapshot()
+
+    copy.plan_dependencies[0].append(1)
+    copy.chat_history.append("message")
+
+    assert state.plan_dependencies == [[], [0]]
+    assert state.chat_history == []
+
+
+def test_placeholders_are_resolved_when_returned():
+    values = TrackedDict({"a": LazyValue(lambda: 1), "b": LazyValue(lambda: 2)})
+
+    assert values.setdefault("a") == 1
+    assert values.popitem() == ("b", 2)
+    assert values.pop("a") == 1
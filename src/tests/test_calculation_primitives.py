@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from agentic_copilot.models.utils.calculation_primitives import (
+    PrimitiveError,
+    aggregate,
+    growth_rate,
+    group_by,
+    monthly,
+    regression,
+)
+
+
+@pytest.fixture
+def df() -> pd.DataFrame:
+    # Alphabetical order of the months (APR, FEB, JAN, MAR) isn't their chronological order
+    return pd.DataFrame(
+        {
+            "service_month": ["MAR-2022", "JAN-2022", "APR-2022", "FEB-2022", "JAN-2022"],
+            "site_name": pd.Categorical(["b", "a", "a", "b", "a"], categories=["a", "b", "unused"]),
+            "value": [30.0, 5.0, 40.0, 20.0, 5.0],
+        }
+    )
+
+
+def test_monthly_is_chronological(df):
+    by_month = monthly(df)
+
+    assert [month.strftime("%b") for month in by_month.index] == ["Jan", "Feb", "Mar", "Apr"]
+    assert by_month.tolist() == [10.0, 20.0, 30.0, 40.0]
+
+
+def test_group_by_month_keys(df):
+    assert list(group_by(df, "service_month")) == ["JAN-2022", "FEB-2022", "MAR-2022", "APR-2022"]
+
+
+def test_group_by_categorical_leaves_out_unused_categories(df):
+    assert group_by(df, "site_name") == {"a": 50.0, "b": 50.0}
+    assert group_by(df, "site_name", "count") == {"a": 3.0, "b": 2.0}
+
+
+def test_group_by_leaves_out_groups_without_values(df):
+    df.loc[df["site_name"] == "b", "value"] = np.nan
+
+    assert group_by(df, "site_name", "mean") == {"a": 50.0 / 3}
+    assert group_by(df, "site_name", "count") == {"a": 3.0, "b": 0.0}
+
+
+def test_growth_rate(df):
+    assert growth_rate(df) == pytest.approx(3.0)
+    assert growth_rate(df, start_month="FEB-2022", end_month="MAR-2022") == pytest.approx(0.5)
+
+
+def test_growth_rate_edge_cases(df):
+    with pytest.raises(PrimitiveError, match="isn't in the data"):
+        growth_rate(df, start_month="MAY-2022")
+    with pytest.raises(PrimitiveError, match="isn't in the data"):
+        growth_rate(df, start_month="2022-01")
+
+    df.loc[df["service_month"] == "JAN-2022", "value"] = 0.0
+    with pytest.raises(PrimitiveError, match="undefined"):
+        growth_rate(df)
+
+    with pytest.raises(PrimitiveError, match="no service months"):
+        growth_rate(df.iloc[0:0])
+
+
+def test_regression(df):
+    result = regression(df)
+
+    assert result["slope_per_month"] == pytest.approx(10.0)
+    assert result["intercept"] == pytest.approx(10.0)
+    assert result["r_squared"] == pytest.approx(1.0)
+
+
+def test_regression_edge_cases(df):
+    with pytest.raises(PrimitiveError, match="at least two"):
+        regression(df[df["service_month"] == "JAN-2022"])
+
+    constant = df.assign(value=1.0)
+    assert regression(constant, "mean")["r_squared"] == 1.0
+
+
+def test_values_that_arent_frames(df):
+    with pytest.raises(PrimitiveError, match="Series"):
+        aggregate(df["value"], "sum")
+    with pytest.raises(PrimitiveError, match="float"):
+        aggregate(np.float64(1.0), "sum")
+
+
+def test_bad_arguments(df):
+    with pytest.raises(PrimitiveError, match="aggregation"):
+        aggregate(df, "mode")
+    with pytest.raises(PrimitiveError, match="isn't numeric"):
+        aggregate(df, "sum", column="service_month")
+    with pytest.raises(PrimitiveError, match="doesn't exist"):
+        aggregate(df, "sum", column="missing")
@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from agentic_copilot.models.utils.agents_util import AgentsState
+from agentic_copilot.models.utils.calculation_sandbox import (
+    CalculationSandboxPool,
+    SandboxError,
+)
+
+
+@pytest.fixture(scope="module")
+def pool():
+    pool = CalculationSandboxPool(workers=1, timeout=30.0)
+    yield pool
+    pool.close()
+
+
+@pytest.fixture
+def state() -> AgentsState:
+    state = AgentsState(user_id=1)
+    state.queried_data["frame"] = pd.DataFrame({"value": [1.0, 2.0, 3.0]})
+    # pandas_engine stores whatever its query evaluates to, not only frames
+    state.queried_data["series"] = pd.Series([4.0, 5.0])
+    state.queried_data["scalar"] = np.float64(6.0)
+    return state
+
+
+def test_series_and_scalar_in_queried_data(pool, state):
+    assert pool.run("result = frame['value'].sum() + series.sum() + scalar", state) == 21.0
+
+
+def test_command_error_is_raised(pool, state):
+    with pytest.raises(SandboxError, match="ZeroDivisionError"):
+        pool.run("result = 1 / 0", state)
+
+    assert pool.run("result = len(series)", state) == 2
+
+
+def test_run_after_close(state):
+    pool = CalculationSandboxPool(workers=1)
+    pool.close()
+
+    with pytest.raises(SandboxError):
+        pool.run("result = 1", state)
+
+
+def test_no_free_worker(state):
+    pool = CalculationSandboxPool(workers=1, timeout=0.5)
+    # The only worker is taken, as if it was busy with a calculation that hangs
+    worker = pool._idle.get()
+    try:
+        with pytest.raises(SandboxError, match="No calculation sandbox worker"):
+            pool.run("result = 1", state)
+
+        pool._idle.put(worker)
+        assert pool.run("result = 1", state) == 1
+    finally:
+        pool.close()
@@ -0,0 +1,16 @@
+from agentic_copilot.models.utils.embedding_cache import EmbeddingCache
+
+
+def test_width_is_taken_from_the_first_vector(tmp_path):
+    cache = EmbeddingCache("model__deployment", max_entries=4, cache_dir=tmp_path)
+    assert cache.get_many(["a"]) == [None]
+
+    cache.put_many(["a", "b"], [[1.0, 2.0, 3.0], [1.0, 2.0]])
+    assert cache.dimensions == 3
+    # A vector of another width isn't cached
+    assert cache.get_many(["a", "b"]) == [[1.0, 2.0, 3.0], None]
+
+    reopened = EmbeddingCache("model__deployment", max_entries=4, cache_dir=tmp_path)
+    assert reopened.dimensions == 3
+    assert reopened.get_many(["a"]) == [[1.0, 2.0, 3.0]]
+
@@ -0,0 +1,147 @@
+import asyncio
+
+import pytest
+
+from agentic_copilot.models.agents.orchestration import plan_executor
+from agentic_copilot.models.agents.orchestration.plan_executor import (
+    STEP_FAILED,
+    PlanExecutor,
+)
+from agentic_copilot.models.utils.agents_util import AgentsState, Speaker
+
+DONE = "DONE"
+NEED_INPUT = "NEED_INPUT"
+
+
+class FakeAgent:
+    """Step agent that stores the instruction as queried data, instructions starting with 'ask' need input."""
+
+    running = 0
+    max_running = 0
+    seen: dict[str, list[str]] = {}
+
+    def __init__(self, state: AgentsState, model) -> None:
+        self.state = state
+
+    async def achat(self, instruction: str) -> tuple[str, str]:
+        FakeAgent.seen[instruction] = sorted(self.state.queried_data)
+        if instruction.startswith("fail"):
+            raise RuntimeError("broken step")
+        if instruction.startswith("ask"):
+            return NEED_INPUT, "which site?"
+
+        FakeAgent.running += 1
+        FakeAgent.max_running = max(FakeAgent.max_running, FakeAgent.running)
+        await asyncio.sleep(0.01)
+        FakeAgent.running -= 1
+
+        self.state.queried_data[instruction] = instruction
+        self.state.calculation_results.append(instruction)
+        return DONE, instruction
+
+    def chat(self, instruction: str) -> str:
+        return str(asyncio.run(self.achat(instruction)))
+
+
+@pytest.fixture(autouse=True)
+def fake_agents(monkeypatch):
+    for speaker in (Speaker.QUERY_ORCHESTRATOR, Speaker.CALCULATION, Speaker.RESEARCH_AGENT):
+        monkeypatch.setitem(plan_executor.STEP_AGENTS, speaker, (FakeAgent, DONE))
+    FakeAgent.running = FakeAgent.max_running = 0
+    FakeAgent.seen = {}
+
+
+def make_state(steps: list[str], dependencies: list[list[int]]) -> AgentsState:
+    state = AgentsState(user_id=1)
+    state.set_plan([(Speaker.QUERY_ORCHESTRATOR.value, step) for step in steps], dependencies)
+    return state
+
+
+def test_ready_steps():
+    state = make_state(["a", "b", "c", "d"], [[], [], [0, 1], [2]])
+    assert state.ready_steps() == [0, 1]
+    assert state.ready_steps(running={0}) == [1]
+
+    state.completed_steps.append(0)
+    assert state.ready_steps() == [1]
+
+    state.completed_steps.append(1)
+    assert state.ready_steps() == [2]
+
+
+def test_steps_without_dependencies_depend_on_earlier_steps():
+    state = make_state(["a", "b", "c"], [[]])
+    assert state.ready_steps() == [0]
+    assert state.step_dependencies(2) == [0, 1]
+
+    # Later or negative steps aren't dependencies
+    state.plan_dependencies = [[], [5, -1]]
+    assert state.step_dependencies(1) == []
+
+
+def test_independent_steps_run_concurrently():
+    state = make_state(["a", "b", "c"], [[], [], [0, 1]])
+
+    assert asyncio.run(PlanExecutor(state).arun()) is None
+    assert FakeAgent.max_running == 2
+    assert state.completed_steps == [0, 1, 2]
+    assert state.current_step == 3
+
+
+def test_parallel_steps_have_their_own_queried_data():
+    state = make_state(["a", "b", "c"], [[], [], [0, 1]])
+    asyncio.run(PlanExecutor(state).arun())
+
+    assert FakeAgent.seen["a"] == [] and FakeAgent.seen["b"] == []
+    assert FakeAgent.seen["c"] == ["a", "b"]
+    assert sorted(state.queried_data) == ["a", "b", "c"]
+    assert sorted(state.calculation_results) == ["a", "b", "c"]
+
+
+def test_max_parallel_steps():
+    state = make_state(["a", "b", "c"], [[], [], []])
+    asyncio.run(PlanExecutor(state, max_parallel_steps=1).arun())
+
+    assert FakeAgent.max_running == 1
+    assert state.completed_steps == [0, 1, 2]
+
+
+def test_execution_stops_at_blocked_step():
+    state = make_state(["a", "ask b", "c", "d"], [[], [], [1], []])
+    blocked = asyncio.run(PlanExecutor(state, max_parallel_steps=2).arun())
+
+    assert blocked.step == 1 and blocked.status == NEED_INPUT
+    assert state.current_step == 1
+    # Step 2 waits for the blocked step, step 3 wasn't started after the block
+    assert 2 not in state.completed_steps and "d" not in FakeAgent.seen
+
+    state.plan[1] = (Speaker.QUERY_ORCHESTRATOR.value, "b")
+    assert asyncio.run(PlanExecutor(state).arun()) is None
+    assert state.completed_steps == [0, 1, 2, 3]
+
+
+def test_run_executes_steps_one_by_one():
+    state = make_state(["a", "b", "ask c", "d"], [[], [], [], []])
+    blocked = PlanExecutor(state).run()
+
+    assert blocked.step == 2
+    assert FakeAgent.max_running == 1
+    assert state.completed_steps == [0, 1]
+    assert "d" not in FakeAgent.seen
+
+
+def test_failed_step():
+    state = make_state(["fail a", "b"], [[], [0]])
+    blocked = asyncio.run(PlanExecutor(state).arun())
+
+    assert blocked.step == 0 and blocked.status == STEP_FAILED
+    assert state.completed_steps == []
+
+
+def test_clear_plan_keeps_current_step():
+    state = make_state(["a"], [[]])
+    state.current_step = 1
+    state.clear_plan()
+
+    assert state.plan == [] and state.plan_dependencies == []
+    assert state.current_step == 1
@@ -0,0 +1,79 @@
+import time
+
+import pandas as pd
+import pytest
+
+from agentic_copilot.models.utils.agents_util import AgentsState
+from agentic_copilot.models.utils.session_store import (
+    SessionConflictError,
+    SqliteSessionStore,
+    TieredSessionStore,
+)
+from agentic_copilot.models.utils.state_snapshot import dump_state
+
+
+def make_state(user_id: int = 1) -> AgentsState:
+    state = AgentsState(user_id=user_id)
+    state.base_utterance = "energy use per site"
+    state.queried_data["energy"] = pd.DataFrame({"site_name": ["a", "b"], "value": [1.0, 2.0]})
+    return state
+
+
+def stored_rows(store: SqliteSessionStore) -> int:
+    return store._db.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+
+@pytest.fixture
+def durable(tmp_path) -> SqliteSessionStore:
+    return SqliteSessionStore(path=tmp_path.joinpath("sessions.sqlite"), ttl=60.0)
+
+
+def test_purge_expired_removes_both_tiers(tmp_path):
+    durable = SqliteSessionStore(path=tmp_path.joinpath("sessions.sqlite"), ttl=0.05)
+    store = TieredSessionStore(durable)
+    store.put("expired", "1", make_state(), None)
+    assert stored_rows(durable) == 1 and len(store._entries) == 1
+
+    time.sleep(0.1)
+    assert store.purge_expired() == 1
+
+    assert stored_rows(durable) == 0
+    assert len(store._entries) == 0 and store._memory_bytes == 0
+    assert store.get("expired", "1") is None
+
+
+def test_evicted_session_is_read_from_sqlite(durable):
+    first = make_state(user_id=1)
+    size = len(dump_state(first))
+    store = TieredSessionStore(durable, max_memory_bytes=size + size // 2)
+
+    store.put("first", "1", first, None)
+    store.put("second", "1", make_state(user_id=1), None)
+    # Only one of the snapshots fits into the memory tier, the least recently used one was evicted
+    assert list(store._entries) == [("second", "1")]
+
+    stored = store.get("first", "1")
+    assert stored.version == 1
+    assert stored.state.base_utterance == "energy use per site"
+    pd.testing.assert_frame_equal(stored.state.queried_data["energy"], first.queried_data["energy"])
+    assert list(store._entries) == [("first", "1")]
+
+
+def test_sessions_are_copies(durable):
+    store = TieredSessionStore(durable)
+    version = store.put("session", "1", make_state(), None)
+
+    stored = store.get("session", "1")
+    stored.state.chat_history.append("changed")
+    assert store.get("session", "1").state.chat_history == []
+
+    store.put("session", "1", stored.state, version)
+    assert store.get("session", "1").state.chat_history == ["changed"]
+
+
+def test_stale_version_conflicts(durable):
+    store = TieredSessionStore(durable)
+    store.put("session", "1", make_state(), None)
+
+    with pytest.raises(SessionConflictError):
+        store.put("session", "1", make_state(), None)
@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from agentic_copilot.models.utils.agents_util import AgentsState, LazyValue
+from agentic_copilot.models.utils.state_snapshot import (
+    ARROW,
+    PICKLE,
+    dump_state,
+    encode_frame,
+    load_state,
+)
+
+
+@pytest.fixture
+def state() -> AgentsState:
+    state = AgentsState(user_id=7)
+    state.base_utterance = "compare the energy use of the sites"
+    state.set_plan([("query_orchestrator_agent", "query energy"), ("calculation_agent", "compare")], [[], [0]])
+    state.completed_steps.append(0)
+    state.chat_history.append("Orchestrator agent to Planning agent: plan it")
+    state.queried_data["energy"] = pd.DataFrame(
+        {
+            "site_name": pd.Categorical(["a", "b", "a"]),
+            "service_month": ["JAN-2022", "JAN-2022", "FEB-2022"],
+            "value": [1.5, 2.0, np.nan],
+        },
+        index=[10, 11, 12],
+    )
+    state.queried_data["total"] = pd.Series([1.0, 2.0], name="value")
+    state.queried_data["mean"] = np.float64(3.5)
+    return state
+
+
+def test_round_trip(state):
+    loaded = load_state(dump_state(state))
+
+    assert loaded.user_id == state.user_id
+    assert loaded.base_utterance == state.base_utterance
+    assert [tuple(step) for step in loaded.plan] == list(state.plan)
+    assert loaded.plan_dependencies == [[], [0]]
+    assert loaded.completed_steps == [0]
+    assert loaded.current_step == 0
+    assert loaded.chat_history == state.chat_history
+
+    pd.testing.assert_frame_equal(loaded.queried_data["energy"], state.queried_data["energy"])
+    pd.testing.assert_series_equal(loaded.queried_data["total"], state.queried_data["total"])
+    assert loaded.queried_data["mean"] == 3.5
+
+
+def test_frames_use_arrow_and_other_values_pickle(state):
+    assert encode_frame(state.queried_data["energy"])[0] == ARROW
+    assert encode_frame(state.queried_data["total"])[0] == PICKLE
+    assert encode_frame(pd.DataFrame({"mixed": [1, "a"]}))[0] == PICKLE
+
+
+def test_frames_are_decoded_lazily(state):
+    snapshot = dump_state(state)
+    loaded = load_state(snapshot)
+
+    assert all(isinstance(loaded.queried_data.raw_get(name), LazyValue) for name in ["energy", "total", "mean"])
+    # An unread frame is written back as the blob it was loaded from
+    assert dump_state(loaded) == snapshot
+
+    loaded.queried_data["energy"]
+    assert isinstance(loaded.queried_data.raw_get("energy"), pd.DataFrame)
+    assert isinstance(loaded.queried_data.raw_get("total"), LazyValue)
+    # Reading isn't a modification, the frame that was read isn't encoded again
+    version = loaded.version
+    assert dump_state(loaded) == snapshot
+    assert loaded.version == version
+
+
+def test_copy_reading_a_frame_doesnt_change_the_original(state):
+    loaded = load_state(dump_state(state))
+    copy = loaded.snapshot()
+
+    copy.queried_data["energy"]
+    assert isinstance(loaded.queried_data.raw_get("energy"), LazyValue)
+    assert dump_state(copy) == dump_state(loaded)
+
+
+def test_not_a_snapshot():
+    with pytest.raises(ValueError):
+        load_state(b'{"client_id": 1}')